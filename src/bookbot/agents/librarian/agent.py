@@ -1,21 +1,69 @@
-from typing import Any, Dict, List, Optional
-import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import asyncio
+import itertools
+import os
 from pathlib import Path
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import insert, update, delete, bindparam
 from sqlalchemy.future import select
+from sqlalchemy.orm.attributes import set_committed_value
 from ..base import Agent
-from ...database.models import Base, Book, Summary
+from ...database.models import Base, Book, Summary, SummaryLevel
 from ...utils.venice_client import VeniceClient, VeniceConfig
 from ...utils.vector_store import VectorStore
 from ...utils.epub_processor import EPUBProcessor
 from ...utils.calibre_connector import CalibreConnector
+from ...utils import serialization
+
+# Number of Calibre books written per transaction during a library sync
+SYNC_BATCH_SIZE = 500
+# Titles per IN query; SQLite builds before 3.32 cap bound parameters at 999
+TITLE_LOOKUP_CHUNK_SIZE = 900
+# EPUB chunks sent to the vector store per call while ingesting a book
+EMBED_BATCH_SIZE = 64
+
+# Statements are built once so SQLAlchemy can serve them from its compiled cache
+_SELECT_BOOK_BY_HASH = select(Book.id, Book.vector_id).where(Book.content_hash == bindparam("content_hash"))
+# Executed against the table so a list of parameters becomes a plain executemany
+_UPDATE_BOOK_METADATA = (
+    update(Book.__table__)
+    .where(Book.__table__.c.id == bindparam("b_id"))
+    .values(book_metadata=bindparam("md"))
+)
+_DELETE_BOOK_BY_ID = delete(Book).where(Book.id == bindparam("book_id"))
+_SELECT_BOOKS_BY_HASHES = select(Book.id, Book.vector_id, Book.content_hash).where(
+    Book.content_hash.in_(bindparam("content_hashes", expanding=True))
+)
+_SELECT_BOOKS_BY_TITLE = select(Book).where(Book.title.in_(bindparam("titles", expanding=True)))
+
+def _chunk_ids(content_hash: str, start: int, count: int) -> List[str]:
+    # Zero-padded so sorting a book's chunk ids restores chunk order
+    return [f"{content_hash}-{index:06d}" for index in range(start, start + count)]
+
+def _batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
 
 class LibrarianAgent(Agent):
+    # action -> (method name, input_data key passed to it, key to wrap a bare result under)
+    _ACTIONS = {
+        "add_book": ("add_book", "book", None),
+        "add_summary": ("add_summary", "summary", None),
+        "add_summaries": ("add_summaries", "summaries", None),
+        "get_book": ("get_book", "book_id", "book"),
+        "process_epub": ("process_epub", "file_path", None),
+        "process_epubs": ("process_epubs", "file_paths", None),
+        "sync_calibre": ("sync_calibre_library", None, None)
+    }
+    
     def __init__(self, venice_config: VeniceConfig, 
              session: Optional[AsyncSession] = None,
              db_url: str = "sqlite+aiosqlite:///:memory:",
              calibre_path: Optional[Path] = None,
-             vram_limit: float = 16.0):
+             vram_limit: float = 16.0,
+             echo: bool = False,
+             pool_options: Optional[Dict[str, Any]] = None):
         super().__init__(vram_limit)
         self.venice = VeniceClient(venice_config)
         self.vector_store = VectorStore("librarian_agent")
@@ -25,7 +73,27 @@ class LibrarianAgent(Agent):
             self.session = session
             self.engine = None
         else:
-            self.engine = create_async_engine(db_url, echo=True)
+            engine_kwargs = {
+                "echo": echo or os.environ.get("BOOKBOT_SQL_ECHO") == "1",  # SQL logging is opt-in
+                "future": True,
+                "json_serializer": serialization.dumps,
+                "json_deserializer": serialization.loads
+            }
+            if not db_url.startswith("sqlite"):
+                # SQLite uses a static/null pool; server databases get a LIFO pool
+                # so hot connections are reused ahead of idle ones. Pre-ping costs a
+                # round trip per checkout, so only turn it on (via pool_options)
+                # when the database is known to drop connections.
+                engine_kwargs.update(
+                    pool_size=20,
+                    max_overflow=40,
+                    pool_timeout=30,
+                    pool_recycle=3600,
+                    pool_pre_ping=False,
+                    pool_use_lifo=True
+                )
+                engine_kwargs.update(pool_options or {})
+            self.engine = create_async_engine(db_url, **engine_kwargs)
             self.async_session = async_sessionmaker(
                 self.engine,
                 class_=AsyncSession,
@@ -35,28 +103,54 @@ class LibrarianAgent(Agent):
         
         self.calibre = CalibreConnector(calibre_path) if calibre_path else None
     
+    async def _create_schema(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session = self.async_session()
+    
     async def initialize(self) -> None:
-        if not self.session and hasattr(self, 'engine'):
-            async with self.engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
-            self.session = self.async_session()
-            
+        # Schema creation and Calibre setup are independent, so run them together
+        tasks = []
+        if not self.session and self.engine is not None:
+            tasks.append(self._create_schema())
         if self.calibre:
-            await self.calibre.initialize()
+            tasks.append(self.calibre.initialize())
+        await asyncio.gather(*tasks)
         self.is_active = True
     
     async def cleanup(self) -> None:
         try:
-            if hasattr(self, 'engine') and self.engine is not None:
-                await self.engine.dispose()
-            if hasattr(self, 'calibre') and self.calibre:
-                await self.calibre.cleanup()
+            tasks = []
+            if self.engine is not None:
+                tasks.append(self.engine.dispose())
+            if self.calibre:
+                tasks.append(self.calibre.cleanup())
+            await asyncio.gather(*tasks)
         except Exception as e:
             print(f"Warning during cleanup: {e}")
         finally:
             self.is_active = False
     
-    async def add_book(self, book_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _commit_and_get_id(self, row: Any) -> int:
+        # The flush populates the autoincrement id, so no refresh round-trip is needed
+        await self.session.flush()
+        row_id = row.id
+        await self.session.commit()
+        return row_id
+    
+    async def _add_to_calibre(self, book_data: Dict[str, Any]) -> None:
+        await self.calibre.add_book({
+            "title": str(book_data.get("title", "Unknown Title")),
+            "author": str(book_data.get("author", "Unknown Author")),
+            "path": book_data.get("path", ""),
+            "format": book_data.get("format", "unknown"),
+            "identifiers": book_data.get("identifiers", {}),
+            "tags": book_data.get("tags", []),
+            "series": book_data.get("series"),
+            "series_index": book_data.get("series_index", 1.0)
+        })
+    
+    async def add_book(self, book_data: Dict[str, Any], to_calibre: bool = True) -> Dict[str, Any]:
         if not isinstance(book_data, dict):
             return {
                 "status": "error",
@@ -68,11 +162,7 @@ class LibrarianAgent(Agent):
             author = str(book_data.get("author", "Unknown Author"))
             content_hash = str(book_data.get("content_hash", ""))
             vector_id = str(book_data.get("vector_id", ""))
-            
-            try:
-                metadata = json.dumps(book_data.get("metadata", {}))
-            except (TypeError, ValueError):
-                metadata = "{}"
+            metadata = book_data.get("metadata") or {}
             
             book = Book(
                 title=title,
@@ -89,27 +179,22 @@ class LibrarianAgent(Agent):
                 }
             
             self.session.add(book)
-            await self.session.commit()
-            await self.session.refresh(book)
             
-            if self.calibre:
-                try:
-                    await self.calibre.add_book({
-                        "title": title,
-                        "author": author,
-                        "path": book_data.get("path", ""),
-                        "format": book_data.get("format", "unknown"),
-                        "identifiers": book_data.get("identifiers", {}),
-                        "tags": book_data.get("tags", []),
-                        "series": book_data.get("series"),
-                        "series_index": book_data.get("series_index", 1.0)
-                    })
-                except Exception as e:
-                    print(f"Warning: Failed to add book to Calibre: {e}")
+            # Commit locally and push to Calibre at the same time
+            tasks = [self._commit_and_get_id(book)]
+            if self.calibre and to_calibre:
+                tasks.append(self._add_to_calibre(book_data))
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            
+            book_id = results[0]
+            if isinstance(book_id, Exception):
+                raise book_id
+            if len(results) > 1 and isinstance(results[1], Exception):
+                print(f"Warning: Failed to add book to Calibre: {results[1]}")
             
             return {
                 "status": "success",
-                "book_id": book.id
+                "book_id": book_id
             }
         except Exception as e:
             print(f"Error adding book: {e}")
@@ -119,31 +204,56 @@ class LibrarianAgent(Agent):
             }
     
     async def add_summary(self, summary_data: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self.add_summaries([summary_data])
+        if result["status"] != "success":
+            return result
+        return {
+            "status": "success",
+            "summary_id": result["summary_ids"][0]
+        }
+    
+    async def add_summaries(self, summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Insert many summaries with a single executemany and one commit."""
+        if not self.session:
+            return {
+                "status": "error",
+                "message": "Session not initialized. Call initialize() first."
+            }
+        if not summaries:
+            return {"status": "success", "summary_ids": []}
+        
         try:
-            summary = Summary(
-                book_id=summary_data["book_id"],
-                level=summary_data["level"],
-                content=summary_data["content"],
-                vector_id=summary_data["vector_id"]
+            rows = [
+                {
+                    "book_id": summary_data["book_id"],
+                    "level": SummaryLevel(summary_data["level"]),
+                    "content": summary_data["content"],
+                    "vector_id": summary_data["vector_id"],
+                    "summary_type": summary_data.get("summary_type"),
+                    "chapter_index": summary_data.get("chapter_index")
+                }
+                for summary_data in summaries
+            ]
+            result = await self.session.execute(
+                insert(Summary).returning(Summary.id, sort_by_parameter_order=True),
+                rows
             )
-            self.session.add(summary)
+            summary_ids = result.scalars().all()
             await self.session.commit()
-            await self.session.refresh(summary)
             return {
                 "status": "success",
-                "summary_id": summary.id
+                "summary_ids": summary_ids
             }
         except Exception as e:
+            await self.session.rollback()
             return {
                 "status": "error",
                 "message": str(e)
             }
     
     async def get_book(self, book_id: int) -> Optional[Dict[str, Any]]:
-        result = await self.session.execute(
-            select(Book).where(Book.id == book_id)
-        )
-        book = result.scalar_one_or_none()
+        # Primary-key lookups are answered from the identity map when the book is already loaded
+        book = await self.session.get(Book, int(book_id))
         if book:
             return {
                 "id": book.id,
@@ -155,35 +265,118 @@ class LibrarianAgent(Agent):
             }
         return None
     
+    async def _add_chunks(self, chunks: List[str], chunk_metadata: Dict[str, str], start: int = 0) -> List[str]:
+        # add_texts copies each metadata dict before storing it, so every chunk
+        # of a book can share the same one
+        return await self.vector_store.add_texts(
+            texts=chunks,
+            metadata=[chunk_metadata] * len(chunks),
+            ids=_chunk_ids(chunk_metadata["content_hash"], start, len(chunks))
+        )
+    
+    async def _stored_chunk_ids(self, content_hash: str) -> List[str]:
+        return sorted(await self.vector_store.get_ids(metadata_filter={"content_hash": content_hash}))
+    
+    async def _discard_chunks(self, ids: Optional[List[str]] = None, content_hash: Optional[str] = None) -> None:
+        # Removes vectors left behind by a failed ingest; a failure here must not hide the original error
+        try:
+            await self.vector_store.delete(
+                ids=ids,
+                metadata_filter={"content_hash": content_hash} if content_hash else None
+            )
+        except Exception as e:
+            print(f"Warning: Failed to remove stored chunks: {e}")
+    
+    async def _embed_chunks(self, chunks: Iterable[str], chunk_metadata: Dict[str, str], start: int = 0) -> List[str]:
+        """Add chunks to the vector store in batches, starting the next batch while the last one embeds."""
+        chunk_ids = []
+        pending = task = None
+        try:
+            for batch in _batched(chunks, EMBED_BATCH_SIZE):
+                task = asyncio.create_task(self._add_chunks(batch, chunk_metadata, start))
+                start += len(batch)
+                if pending:
+                    chunk_ids.extend(await pending)
+                pending = task
+            if pending:
+                chunk_ids.extend(await pending)
+        except BaseException:
+            # Both the batch being awaited and the one started after it may still be
+            # running; gathering them all also retrieves an exception one already raised
+            started = {t for t in (pending, task) if t}
+            for t in started:
+                t.cancel()
+            await asyncio.gather(*started, return_exceptions=True)
+            raise
+        return chunk_ids
+    
     async def process_epub(self, file_path: str) -> Dict[str, Any]:
         try:
             # Process EPUB file
-            epub_data = await self.epub_processor.process_file(file_path)
-            if not epub_data or not epub_data.get("chunks"):
+            epub_data = await self.epub_processor.stream_file(file_path)
+            
+            # Re-ingesting a known book reuses its stored vectors instead of re-embedding
+            if self.session:
+                result = await self.session.execute(
+                    _SELECT_BOOK_BY_HASH, {"content_hash": epub_data["content_hash"]}
+                )
+                existing = result.first()
+                if existing:
+                    return {
+                        "status": "success",
+                        "book_id": existing.id,
+                        "vector_ids": await self._stored_chunk_ids(epub_data["content_hash"]),
+                        "cached": True
+                    }
+            
+            chunk_metadata = {"content_hash": epub_data["content_hash"]}
+            batches = _batched(epub_data["chunks"], EMBED_BATCH_SIZE)
+            first_batch = next(batches, None)
+            if not first_batch:
                 return {
                     "status": "error",
                     "message": "Failed to process EPUB file or no content found"
                 }
             
-            # Add content chunks to vector store
-            chunk_ids = await self.vector_store.add_texts(
-                texts=epub_data["chunks"],
-                metadata=[{"content_hash": epub_data["content_hash"]} for _ in epub_data["chunks"]]
-            )
+            try:
+                # Only the first chunk id is stored with the book, so insert the row
+                # while the remaining chunks are being embedded
+                first_ids = await self._add_chunks(first_batch, chunk_metadata)
+                book_data = {
+                    "title": epub_data["metadata"].get("title", "Unknown Title"),
+                    "author": epub_data["metadata"].get("author", "Unknown Author"),
+                    "content_hash": epub_data["content_hash"],
+                    "metadata": epub_data["metadata"],
+                    "vector_id": first_ids[0]  # Store first chunk ID
+                }
+                book_result, rest_ids = await asyncio.gather(
+                    self.add_book(book_data, to_calibre=False),
+                    self._embed_chunks(itertools.chain.from_iterable(batches), chunk_metadata, len(first_batch)),
+                    return_exceptions=True
+                )
+                if isinstance(book_result, Exception):
+                    raise book_result
+                if book_result["status"] != "success":
+                    raise RuntimeError(book_result["message"])
+                
+                if isinstance(rest_ids, Exception):
+                    # Embedding failed, so drop the row rather than leave a book with partial vectors
+                    await self.session.execute(_DELETE_BOOK_BY_ID, {"book_id": book_result["book_id"]})
+                    await self.session.commit()
+                    raise rest_ids
+                chunk_ids = first_ids + rest_ids
+            except Exception:
+                # Remove the chunks stored so far so a retry does not leave orphaned vectors
+                await self._discard_chunks(content_hash=epub_data["content_hash"])
+                raise
             
-            # Add book to database
-            book_data = {
-                "title": epub_data["metadata"].get("title", "Unknown Title"),
-                "author": epub_data["metadata"].get("author", "Unknown Author"),
-                "content_hash": epub_data["content_hash"],
-                "metadata": epub_data["metadata"],
-                "vector_id": chunk_ids[0] if chunk_ids else ""  # Store first chunk ID
-            }
+            # Only a fully ingested book is pushed to Calibre
+            if self.calibre:
+                try:
+                    await self._add_to_calibre(book_data)
+                except Exception as e:
+                    print(f"Warning: Failed to add book to Calibre: {e}")
             
-            book_result = await self.add_book(book_data)
-            if book_result["status"] != "success":
-                return book_result
-                
             return {
                 "status": "success",
                 "book_id": book_result["book_id"],
@@ -195,21 +388,139 @@ class LibrarianAgent(Agent):
                 "message": str(e)
             }
     
+    async def process_epubs(self, file_paths: List[str]) -> Dict[str, Any]:
+        """Ingest several EPUB files with a single vector store call and a single insert."""
+        if not self.session:
+            return {
+                "status": "error",
+                "message": "Session not initialized. Call initialize() first."
+            }
+        
+        try:
+            epubs = await asyncio.gather(
+                *(self.epub_processor.process_file(file_path) for file_path in file_paths),
+                return_exceptions=True
+            )
+            
+            processed = []
+            errors = []
+            for file_path, epub_data in zip(file_paths, epubs):
+                if isinstance(epub_data, Exception):
+                    errors.append({"file_path": file_path, "error": str(epub_data)})
+                elif not epub_data or not epub_data.get("chunks"):
+                    errors.append({"file_path": file_path, "error": "Failed to process EPUB file or no content found"})
+                else:
+                    processed.append((file_path, epub_data))
+            
+            if not processed:
+                return {
+                    "status": "error",
+                    "message": "No EPUB files could be processed",
+                    "errors": errors
+                }
+            
+            # Books already ingested (or repeated in this batch) reuse stored vectors instead of re-embedding
+            by_hash: Dict[str, Dict[str, Any]] = {}
+            for _, epub_data in processed:
+                by_hash.setdefault(epub_data["content_hash"], epub_data)
+            entries: Dict[str, Dict[str, Any]] = {}
+            for content_hashes in _batched(list(by_hash), TITLE_LOOKUP_CHUNK_SIZE):
+                result = await self.session.execute(_SELECT_BOOKS_BY_HASHES, {"content_hashes": content_hashes})
+                for row in result:
+                    entries[row.content_hash] = {
+                        "book_id": row.id,
+                        "vector_ids": await self._stored_chunk_ids(row.content_hash),
+                        "cached": True
+                    }
+            new_books = [epub_data for content_hash, epub_data in by_hash.items() if content_hash not in entries]
+            
+            if new_books:
+                # Embed the chunks of every new book in one batch, remembering where each book starts
+                all_chunks = []
+                all_metadata = []
+                all_ids = []
+                offsets = [0]
+                for epub_data in new_books:
+                    all_chunks.extend(epub_data["chunks"])
+                    all_metadata.extend([{"content_hash": epub_data["content_hash"]}] * len(epub_data["chunks"]))
+                    all_ids.extend(_chunk_ids(epub_data["content_hash"], 0, len(epub_data["chunks"])))
+                    offsets.append(len(all_chunks))
+                
+                try:
+                    chunk_ids = await self.vector_store.add_texts(texts=all_chunks, metadata=all_metadata, ids=all_ids)
+                    vector_ids = [chunk_ids[offsets[i]:offsets[i + 1]] for i in range(len(new_books))]
+                    
+                    rows = [
+                        {
+                            "title": epub_data["metadata"].get("title", "Unknown Title"),
+                            "author": epub_data["metadata"].get("author", "Unknown Author"),
+                            "content_hash": epub_data["content_hash"],
+                            "book_metadata": epub_data["metadata"],
+                            "vector_id": ids[0] if ids else ""
+                        }
+                        for epub_data, ids in zip(new_books, vector_ids)
+                    ]
+                    result = await self.session.execute(
+                        insert(Book).returning(Book.id, sort_by_parameter_order=True),
+                        rows
+                    )
+                    book_ids = result.scalars().all()
+                    await self.session.commit()
+                except Exception:
+                    await self.session.rollback()
+                    await self._discard_chunks(ids=all_ids)
+                    raise
+                for epub_data, book_id, ids in zip(new_books, book_ids, vector_ids):
+                    entries[epub_data["content_hash"]] = {"book_id": book_id, "vector_ids": ids}
+            
+            return {
+                "status": "success",
+                "books": [
+                    {"file_path": file_path, **entries[epub_data["content_hash"]]}
+                    for file_path, epub_data in processed
+                ],
+                "errors": errors if errors else None
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+    
+    async def _find_books_by_title(self, session: AsyncSession, titles: List[str]) -> Dict[str, Book]:
+        """Fetch the existing books for the given titles, keyed by title."""
+        unique_titles = list(dict.fromkeys(titles))
+        books_by_title = {}
+        for start in range(0, len(unique_titles), TITLE_LOOKUP_CHUNK_SIZE):
+            result = await session.execute(
+                _SELECT_BOOKS_BY_TITLE,
+                {"titles": unique_titles[start:start + TITLE_LOOKUP_CHUNK_SIZE]}
+            )
+            books_by_title.update((book.title, book) for book in result.scalars())
+        return books_by_title
+    
     async def sync_calibre_library(self) -> Dict[str, Any]:
-        if not hasattr(self, 'calibre') or not self.calibre:
+        if not self.calibre:
             return {"status": "error", "message": "Calibre integration not configured"}
+        if not self.session:
+            return {
+                "status": "error",
+                "message": "Session not initialized. Call initialize() first."
+            }
         
         try:
             books = await self.calibre.get_books()
             synced_count = 0
             
-            for book in books:
-                async with self.async_session() as session:
-                    result = await session.execute(
-                        select(Book).where(Book.title == book["title"])
-                    )
-                    existing = result.scalar_one_or_none()
-                    
+            existing_by_title = await self._find_books_by_title(
+                self.session, [book["title"] for book in books]
+            )
+            
+            for start in range(0, len(books), SYNC_BATCH_SIZE):
+                batch = books[start:start + SYNC_BATCH_SIZE]
+                new_rows = {}  # title -> insert parameters for books first seen in this batch
+                updates = {}  # book id -> merged metadata for books already stored
+                for book in batch:
                     calibre_metadata = {
                         "calibre_id": book["id"],
                         "format": book["format"],
@@ -220,23 +531,40 @@ class LibrarianAgent(Agent):
                         "last_modified": book["last_modified"].isoformat() if book.get("last_modified") else None
                     }
                     
+                    existing = existing_by_title.get(book["title"])
                     if existing:
-                        # Update metadata while preserving existing BookBot data
-                        current_metadata = json.loads(existing.book_metadata) if existing.book_metadata else {}
-                        current_metadata.update(calibre_metadata)
-                        existing.book_metadata = json.dumps(current_metadata)
-                        await session.commit()
+                        # Update metadata while preserving existing BookBot data; the
+                        # in-memory copy is set as already persisted and written below
+                        merged = {**(existing.book_metadata or {}), **calibre_metadata}
+                        set_committed_value(existing, "book_metadata", merged)
+                        updates[existing.id] = merged
+                    elif book["title"] in new_rows:
+                        row = new_rows[book["title"]]
+                        row["book_metadata"] = {**row["book_metadata"], **calibre_metadata}
                     else:
                         # Add new book
-                        new_book = Book(
-                            title=book["title"],
-                            author=book["author"],
-                            book_metadata=json.dumps(calibre_metadata)
-                        )
-                        session.add(new_book)
-                        await session.commit()
+                        new_rows[book["title"]] = {
+                            "title": book["title"],
+                            "author": book["author"],
+                            "book_metadata": calibre_metadata
+                        }
                     
                     synced_count += 1
+                
+                if updates:
+                    await self.session.execute(
+                        _UPDATE_BOOK_METADATA,
+                        [{"b_id": book_id, "md": metadata} for book_id, metadata in updates.items()]
+                    )
+                if new_rows:
+                    # Bulk INSERT .. RETURNING skips the per-object unit of work but still
+                    # hands back Book instances, so later batches can update them
+                    inserted = await self.session.scalars(
+                        insert(Book).returning(Book, sort_by_parameter_order=True),
+                        list(new_rows.values())
+                    )
+                    existing_by_title.update((new_book.title, new_book) for new_book in inserted)
+                await self.session.commit()
             
             return {
                 "status": "success",
@@ -244,6 +572,7 @@ class LibrarianAgent(Agent):
                 "total_books": len(books)
             }
         except Exception as e:
+            await self.session.rollback()
             return {
                 "status": "error",
                 "message": str(e)
@@ -257,34 +586,23 @@ class LibrarianAgent(Agent):
                 "message": "No action specified"
             }
         
+        entry = self._ACTIONS.get(action)
+        if entry is None:
+            return {
+                "status": "error",
+                "message": f"Unknown action: {action}"
+            }
+        method_name, input_key, result_key = entry
+        
         try:
-            if action == "add_book":
-                result = await self.add_book(input_data["book"])
-                return {
-                    "status": "success",
-                    "book_id": result["book_id"]
-                }
-            elif action == "add_summary":
-                result = await self.add_summary(input_data["summary"])
+            method = getattr(self, method_name)
+            result = await (method(input_data[input_key]) if input_key else method())
+            if result_key:
                 return {
                     "status": "success",
-                    "summary_id": result["summary_id"]
-                }
-            elif action == "get_book":
-                book = await self.get_book(input_data["book_id"])
-                return {
-                    "status": "success",
-                    "book": book
-                }
-            elif action == "process_epub":
-                return await self.process_epub(input_data["file_path"])
-            elif action == "sync_calibre":
-                return await self.sync_calibre_library()
-            else:
-                return {
-                    "status": "error",
-                    "message": f"Unknown action: {action}"
+                    result_key: result
                 }
+            return result
         except Exception as e:
             return {
                 "status": "error",
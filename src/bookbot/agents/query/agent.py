@@ -1,14 +1,45 @@
-from typing import Any, Dict, List
-import json
+from typing import Any, Dict, Iterable, List
+from collections import OrderedDict
 import hashlib
+import asyncio
+import re
+import time
 from ..base import Agent
 from ...utils.venice_client import VeniceClient, VeniceConfig
 from ...utils.vector_store import VectorStore
 from ...utils.cache import AsyncCache
+from ...utils import serialization
 from ...database.models import Book, Summary
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import bindparam
 from sqlalchemy.future import select
 
+_SELECT_BOOKS_BY_ID = select(Book).where(Book.id.in_(bindparam("book_ids", expanding=True)))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+PROMPT_TEMPLATE = """Answer the following question using ONLY the provided context. If the answer cannot be fully derived from the context, acknowledge what is known and what is not. Use citation IDs (e.g. [1], [2]) to reference sources.
+
+Question: {question}
+
+Context:
+{context}
+
+Provide your response in JSON format with these fields:
+- answer (string): Your detailed response with citation IDs
+- citations (list): List of citation IDs used
+- confidence (float): Your confidence in the answer (0-1)"""
+
+# Above these sizes prompt assembly and response parsing move off the event loop
+LARGE_CONTEXT_CHARS = 16384
+LARGE_RESPONSE_CHARS = 8192
+
+BOOK_CACHE_SIZE = 1024
+BOOK_CACHE_TTL = 600  # seconds; bounds how long a removed book can still be cited
+
+def _build_prompt(question: str, context_parts: List[str]) -> str:
+    return PROMPT_TEMPLATE.format(question=question, context="\n\n".join(context_parts))
+
 class QueryAgent(Agent):
     def __init__(self, venice_config: VeniceConfig, session: AsyncSession, vram_limit: float = 16.0):
         super().__init__(vram_limit)
@@ -16,6 +47,9 @@ class QueryAgent(Agent):
         self.vector_store = VectorStore("query_agent", venice_client=self.venice)
         self.session = session
         self._response_cache = AsyncCache(ttl=3600, max_memory_mb=100)  # Cache responses for 1 hour
+        self._search_cache = AsyncCache(ttl=600, max_size=256)  # Vector search hits per normalized question
+        self._venice_semaphore = asyncio.Semaphore(venice_config.max_concurrency)  # Bounds in-flight Venice calls
+        self._book_cache = OrderedDict()  # book id -> (citation details, fetch time), least recent first
     
     async def initialize(self) -> None:
         self.is_active = True
@@ -23,34 +57,75 @@ class QueryAgent(Agent):
     async def cleanup(self) -> None:
         self.is_active = False
         await self._response_cache.clear()
+        await self._search_cache.clear()
+        self._book_cache.clear()
+    
+    async def _get_books(self, book_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Return citation details by id, querying only ids missing from the LRU cache."""
+        now = time.monotonic()
+        books_by_id = {}
+        missing = []
+        for book_id in book_ids:
+            cached = self._book_cache.get(book_id)
+            if cached and now - cached[1] < BOOK_CACHE_TTL:
+                self._book_cache.move_to_end(book_id)
+                books_by_id[book_id] = cached[0]
+            else:
+                missing.append(book_id)
+        
+        if missing:
+            books = await self.session.execute(_SELECT_BOOKS_BY_ID, {"book_ids": missing})
+            for book in books.scalars():
+                info = {"id": book.id, "title": book.title, "author": book.author}
+                books_by_id[book.id] = info
+                self._book_cache[book.id] = (info, now)
+                self._book_cache.move_to_end(book.id)
+            while len(self._book_cache) > BOOK_CACHE_SIZE:
+                self._book_cache.popitem(last=False)
+        return books_by_id
+    
+    async def _similarity_search(self, query: str, k: int) -> List[Dict[str, Any]]:
+        # Repeated questions skip both the query embedding and the ANN search
+        normalized = _WHITESPACE_RE.sub(" ", query).strip().lower()
+        cache_key = hashlib.blake2b(f"{k}:{normalized}".encode(), digest_size=16, usedforsecurity=False).digest()
+        results = await self._search_cache.get(cache_key)
+        if results is not None:
+            return results
+        
+        # The search embeds the query through Venice, so it shares the request bound
+        async with self._venice_semaphore:
+            results = await self.vector_store.similarity_search(query, k=k)
+        await self._search_cache.set(cache_key, results)
+        return results
     
     async def find_relevant_content(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
         try:
-            # Search for relevant summaries and book content
-            results = await self.vector_store.similarity_search(query, k=k)
+            # Search for relevant summaries and book content while the session
+            # checks out its connection for the book lookup
+            results, _ = await asyncio.gather(
+                self._similarity_search(query, k),
+                self.session.connection()
+            )
             if not results:
                 return []
             
-            # Get full book details for citations
-            relevant_content = []
-            for result in results:
-                book_id = result["metadata"].get("book_id")
-                if book_id:
-                    book = await self.session.execute(
-                        select(Book).where(Book.id == book_id)
-                    )
-                    book = book.scalar_one_or_none()
-                    if book:
-                        relevant_content.append({
-                            "content": result["content"],
-                            "book": {
-                                "id": book.id,
-                                "title": book.title,
-                                "author": book.author
-                            },
-                            "score": 1 - result.get("distance", 0)
-                        })
-            return relevant_content
+            # Get full book details for citations, hitting the database once at most
+            book_ids = {
+                int(result["metadata"]["book_id"])
+                for result in results if result["metadata"].get("book_id")
+            }
+            books_by_id = await self._get_books(book_ids)
+            
+            return [
+                {
+                    "content": result["content"],
+                    "book": book,
+                    "score": 1 - result.get("distance", 0)
+                }
+                for result in results
+                if (book_id := result["metadata"].get("book_id"))
+                and (book := books_by_id.get(int(book_id))) is not None
+            ]
         except Exception as e:
             print(f"Error finding relevant content: {str(e)}")
             return []
@@ -77,27 +152,23 @@ class QueryAgent(Agent):
                     "relevance_score": content['score']
                 })
             
-            context = "\n\n".join(context_parts)
-            prompt = f"""Answer the following question using ONLY the provided context. If the answer cannot be fully derived from the context, acknowledge what is known and what is not. Use citation IDs (e.g. [1], [2]) to reference sources.
-
-Question: {query}
-
-Context:
-{context}
-
-Provide your response in JSON format with these fields:
-- answer (string): Your detailed response with citation IDs
-- citations (list): List of citation IDs used
-- confidence (float): Your confidence in the answer (0-1)"""
+            if sum(len(c["content"]) for c in relevant_content) > LARGE_CONTEXT_CHARS:
+                prompt = await asyncio.to_thread(_build_prompt, query, context_parts)
+            else:
+                prompt = _build_prompt(query, context_parts)
             
-            result = await self.venice.generate(prompt, temperature=0.3)
+            async with self._venice_semaphore:
+                result = await self.venice.generate(prompt, temperature=0.3, response_format="json")
+            text = result["choices"][0]["text"]
             try:
-                # Parse response
-                text = result["choices"][0]["text"]
+                # Parse response; JSON-mode responses arrive already parsed
                 if isinstance(text, dict):
                     response = text
+                elif len(text) > LARGE_RESPONSE_CHARS:
+                    # Keep the event loop free while a long answer is parsed
+                    response = await asyncio.to_thread(serialization.loads, text)
                 else:
-                    response = json.loads(text)
+                    response = serialization.loads(text)
                 
                 # Combine LLM confidence with relevance scores
                 llm_confidence = float(response.get("confidence", 0.7))
@@ -114,9 +185,9 @@ Provide your response in JSON format with these fields:
                 ]
                 
                 return response
-            except (json.JSONDecodeError, ValueError, KeyError, TypeError):
+            except (ValueError, KeyError, TypeError):  # JSONDecodeError is a ValueError
                 return {
-                    "answer": result["choices"][0]["text"],
+                    "answer": text,
                     "citations": citations,  # Include all citations for non-JSON responses
                     "confidence": max(0.0, min(1.0, avg_score * 0.7))  # Base confidence on relevance
                 }
@@ -137,13 +208,11 @@ Provide your response in JSON format with these fields:
             return {"status": "error", "message": "No question provided"}
             
         # Preprocess question
-        question = question.replace("\n", " ").replace("\r", " ")
-        while "  " in question:
-            question = question.replace("  ", " ")
+        question = _WHITESPACE_RE.sub(" ", question)
             
         try:
-            # Generate cache key
-            cache_key = hashlib.sha256(question.encode()).hexdigest()
+            # Generate cache key; only needs to be collision-resistant, not cryptographic
+            cache_key = hashlib.blake2b(question.encode(), digest_size=16, usedforsecurity=False).digest()
             
             # Check cache
             cached_response = await self._response_cache.get(cache_key)
@@ -1,13 +1,62 @@
 from typing import Any, Dict, List, Optional
-import json
+import asyncio
+import re
+import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..base import Agent
 from ...utils.venice_client import VeniceClient, VeniceConfig
 from ...utils.vector_store import VectorStore
 from ...utils.rate_limiter import RateLimiter
 from ...utils.cache import AsyncCache
+from ...utils import serialization
 from datetime import datetime, timedelta
 
+# Rough upper bound on one evaluation round trip. Keeping as many evaluations in
+# flight as the rate limiter admits over that span saturates the limit without
+# queueing a backlog of requests behind it.
+EVALUATION_LATENCY_SECONDS = 10
+
+# Markdown code fences the model sometimes wraps its JSON in
+_JSON_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+EVALUATION_PROMPT_TEMPLATE = """Evaluate this book for inclusion in an AI research library:
+Title: {title}
+Author: {author}
+Description: {description}
+Publication Date: {publication_date}
+Publisher: {publisher}
+Language: {language}
+
+Evaluate based on:
+1. Relevance to AI/ML research (0-40 points)
+2. Technical depth and accuracy (0-30 points)
+3. Publication recency and updates (0-15 points)
+4. Author expertise and credibility (0-15 points)
+
+Consider:
+- Core ML/AI concepts coverage
+- Code examples and practical applications
+- Research paper citations and academic rigor
+- Industry best practices and standards
+- Real-world use cases and implementations
+- Mathematical foundations
+- Current state-of-the-art coverage
+
+Provide evaluation as JSON with fields:
+- relevance_score (0-40)
+- technical_score (0-30)
+- recency_score (0-15)
+- expertise_score (0-15)
+- total_score (0-100)
+- reasoning (detailed string)
+- key_topics (list of strings)
+- target_audience (string)
+- prerequisites (list of strings)
+- recommended_reading_order (integer 1-5, where 1 is introductory and 5 is advanced)
+
+Respond with ONLY valid JSON.
+"""
+
 class SelectionAgent(Agent):
     def __init__(self, venice_config: VeniceConfig, session: AsyncSession, vram_limit: float = 16.0):
         super().__init__(vram_limit)
@@ -45,41 +94,7 @@ class SelectionAgent(Agent):
 
         metadata = await self.extract_metadata(book_data)
         
-        prompt = f"""Evaluate this book for inclusion in an AI research library:
-Title: {metadata['title']}
-Author: {metadata['author']}
-Description: {metadata['description']}
-Publication Date: {metadata.get('publication_date', 'Unknown')}
-Publisher: {metadata.get('publisher', 'Unknown')}
-Language: {metadata['language']}
-
-Evaluate based on:
-1. Relevance to AI/ML research (0-40 points)
-2. Technical depth and accuracy (0-30 points)
-3. Publication recency and updates (0-15 points)
-4. Author expertise and credibility (0-15 points)
-
-Consider:
-- Core ML/AI concepts coverage
-- Code examples and practical applications
-- Research paper citations and academic rigor
-- Industry best practices and standards
-- Real-world use cases and implementations
-- Mathematical foundations
-- Current state-of-the-art coverage
-
-Provide evaluation as JSON with fields:
-- relevance_score (0-40)
-- technical_score (0-30)
-- recency_score (0-15)
-- expertise_score (0-15)
-- total_score (0-100)
-- reasoning (detailed string)
-- key_topics (list of strings)
-- target_audience (string)
-- prerequisites (list of strings)
-- recommended_reading_order (integer 1-5, where 1 is introductory and 5 is advanced)
-"""
+        prompt = EVALUATION_PROMPT_TEMPLATE.format_map(metadata)
         async with self.rate_limiter:
             result = await self.venice.generate(prompt)
             
@@ -98,15 +113,31 @@ Provide evaluation as JSON with fields:
         evaluations = []
         selected_books = []
         errors = []
+        vector_texts = []
+        vector_metadata = []
         
-        for book in input_data["books"]:
+        # Evaluate books concurrently; the semaphore keeps bursts within the rate limit
+        limits = self.rate_limiter.config
+        semaphore = asyncio.Semaphore(
+            max(1, limits.requests_per_window * EVALUATION_LATENCY_SECONDS // limits.window_seconds)
+        )
+        
+        async def evaluate(book: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.evaluate_book(book)
+        
+        books = input_data["books"]
+        results = await asyncio.gather(*(evaluate(book) for book in books), return_exceptions=True)
+        
+        for book, evaluation in zip(books, results):
             try:
-                evaluation = await self.evaluate_book(book)
+                if isinstance(evaluation, Exception):
+                    raise evaluation
                 evaluations.append(evaluation)
                 
                 if evaluation and "choices" in evaluation:
                     try:
-                        eval_data = json.loads(evaluation["choices"][0]["text"])
+                        eval_data = serialization.loads(_JSON_FENCE_RE.sub("", evaluation["choices"][0]["text"]))
                         total_score = eval_data.get("total_score", 
                                                   sum([eval_data.get("relevance_score", 0),
                                                       eval_data.get("technical_score", 0),
@@ -114,17 +145,15 @@ Provide evaluation as JSON with fields:
                                                       eval_data.get("expertise_score", 0)]))
                         
                         if total_score >= 70:  # Selection threshold
-                            # Store embeddings for future similarity search
+                            # Embeddings for future similarity search are stored in one call below
                             content = book.get("description", "") + "\n" + "\n".join(eval_data.get("key_topics", []))
-                            await self.vector_store.add_texts(
-                                texts=[content],
-                                metadata=[{
-                                    "book_id": book.get("id"),
-                                    "title": book.get("title"),
-                                    "score": total_score,
-                                    "reading_order": eval_data.get("recommended_reading_order", 3)
-                                }]
-                            )
+                            vector_texts.append(content)
+                            vector_metadata.append({
+                                "book_id": book.get("id"),
+                                "title": book.get("title"),
+                                "score": total_score,
+                                "reading_order": eval_data.get("recommended_reading_order", 3)
+                            })
                             
                             selected_books.append({
                                 **book,
@@ -136,6 +165,28 @@ Provide evaluation as JSON with fields:
             except Exception as e:
                 errors.append({"book": book.get("title"), "error": f"Processing error: {str(e)}"})
         
+        if vector_texts:
+            # Ids are fixed up front so the retry below can tell which books the batch already stored
+            vector_ids = [str(uuid.uuid4()) for _ in vector_texts]
+            try:
+                await self.vector_store.add_texts(texts=vector_texts, metadata=vector_metadata, ids=vector_ids)
+            except Exception:
+                # add_texts writes in slices, so retry book by book only what is missing;
+                # one bad entry then drops just that book from the selection
+                try:
+                    already_stored = set(await self.vector_store.get_ids(ids=vector_ids))
+                except Exception:
+                    already_stored = set()  # Re-adding an existing id is a no-op in the store
+                stored = []
+                for book, text, metadata, vector_id in zip(selected_books, vector_texts, vector_metadata, vector_ids):
+                    try:
+                        if vector_id not in already_stored:
+                            await self.vector_store.add_texts(texts=[text], metadata=[metadata], ids=[vector_id])
+                        stored.append(book)
+                    except Exception as e:
+                        errors.append({"book": book.get("title"), "error": f"Vector storage error: {str(e)}"})
+                selected_books = stored
+        
         # Sort selected books by score and reading order
         selected_books.sort(key=lambda x: (-x["total_score"], x["evaluation"].get("recommended_reading_order", 3)))
         
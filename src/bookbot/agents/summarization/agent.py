@@ -1,5 +1,9 @@
-from typing import Any, Dict, List
+from typing import Any, Awaitable, Dict, Iterator, List, TypeVar
+import asyncio
 import hashlib
+import logging
+import re
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..base import Agent
 from ...utils.venice_client import VeniceClient, VeniceConfig
@@ -8,6 +12,53 @@ from ...utils.cache import AsyncCache
 from ...utils.rate_limiter import AsyncRateLimiter, RateLimitConfig
 from ...database.models import Summary, SummaryType, SummaryLevel
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Summary rows per executemany INSERT
+SUMMARY_INSERT_BATCH_SIZE = 500
+
+# Summary tasks that may run at once, however many chapters a book has
+SUMMARY_TASK_CONCURRENCY = 16
+
+# Lines that start a new chapter
+CHAPTER_PATTERNS = [
+    r"^Chapter\s+\d+",
+    r"^CHAPTER\s+\d+",
+    r"^\d+\.\s+[A-Z]",
+    r"^Part\s+\d+",
+    r"^Section\s+\d+",
+    r"^Book\s+\d+",
+    r"^Volume\s+\d+",
+    r"^\d+\s*$"
+]
+_CHAPTER_REGEX = re.compile("|".join(CHAPTER_PATTERNS), re.MULTILINE)
+
+# (level, approximate tokens, prompt adjective, prompt focus), most detailed first
+SUMMARY_LEVELS = [
+    (SummaryLevel.DETAILED, 512, "detailed", "key concepts and technical details"),
+    (SummaryLevel.CONCISE, 256, "concise", "main ideas and relationships"),
+    (SummaryLevel.BRIEF, 128, "brief", "core message")
+]
+
+# Characters encoded per update when hashing book content
+HASH_CHUNK_CHARS = 65536
+
+def _hash_text(text: str) -> hashlib.blake2b:
+    # Encode in slices so a large book is never copied into one bytes object
+    digest = hashlib.blake2b(digest_size=16, usedforsecurity=False)
+    for start in range(0, len(text), HASH_CHUNK_CHARS):
+        digest.update(text[start:start + HASH_CHUNK_CHARS].encode())
+    return digest
+
+SUMMARY_PROMPT_TEMPLATE = """Generate a {level_type} summary of the following text.
+Focus on {focus}.
+Length: approximately {tokens} tokens.
+Context: {context}
+
+Text: {content}"""
+
 class SummarizationAgent(Agent):
     def __init__(self, venice_config: VeniceConfig, session: AsyncSession, vram_limit: float = 16.0):
         super().__init__(vram_limit)
@@ -15,6 +66,9 @@ class SummarizationAgent(Agent):
         self.vector_store = VectorStore("summarization_agent", venice_client=self.venice)
         self.session = session
         self._summary_cache = AsyncCache(ttl=3600, max_memory_mb=100)
+        self._embedding_cache = AsyncCache(ttl=86400, max_memory_mb=50)  # Keyed by summary text
+        self._venice_semaphore = asyncio.Semaphore(venice_config.max_concurrency)  # Bounds in-flight Venice calls
+        self._task_semaphore = asyncio.Semaphore(SUMMARY_TASK_CONCURRENCY)  # Bounds summary tasks holding prompts
         self._rate_limiter = AsyncRateLimiter(RateLimitConfig(
             requests_per_window=60,
             window_seconds=60,
@@ -28,85 +82,120 @@ class SummarizationAgent(Agent):
         self.is_active = False
     
     async def generate_hierarchical_summary(self, content: str, depth: int = 3, context: str = "") -> List[Dict[str, Any]]:
-        cache_key = hashlib.sha256(f"{content}{depth}{context}".encode()).hexdigest()
+        # Hash the fields one at a time so a large content string is not copied into an f-string first
+        key_hash = _hash_text(content)
+        key_hash.update(f"\0{depth}\0{context}".encode())
+        cache_key = key_hash.digest()
         cached = await self._summary_cache.get(cache_key)
         if cached:
             return cached
             
-        summaries = []
         await self._rate_limiter.wait_for_token()
         
-        # Always generate DETAILED first
-        tokens = 512
-        prompt = f"""Generate a detailed summary of the following text.
-Focus on key concepts and technical details.
-Length: approximately {tokens} tokens.
-Context: {context}
-
-Text: {content}"""
+        # Every level summarizes the same text, so all levels go in one batched request
+        levels = SUMMARY_LEVELS[:max(1, depth)]
+        prompts = [
+            SUMMARY_PROMPT_TEMPLATE.format(
+                level_type=level_type, focus=focus, tokens=tokens, context=context, content=content
+            )
+            for _, tokens, level_type, focus in levels
+        ]
         try:
-            result = await self.venice.generate(prompt=prompt, temperature=0.3)
-            summary_text = result["choices"][0]["text"]
-            embedding = await self.venice.embed(summary_text)
-            vector_id = f"summary_{hashlib.sha256(summary_text.encode()).hexdigest()}"
+            async with self._venice_semaphore:
+                results = await self.venice.generate_batch(prompts, temperature=0.3)
+            summary_texts = [result["choices"][0]["text"] for result in results]
+            embeddings = await self._embed_texts(summary_texts)
             
-            summaries.append({
-                "level": SummaryLevel.DETAILED,
-                "content": summary_text,
-                "vector": embedding["data"][0]["embedding"],
-                "vector_id": vector_id
-            })
-            
-            # Generate additional levels if requested
-            if depth > 1:
-                for level in range(1, depth):
-                    tokens = 256 if level == 1 else 128
-                    level_type = "concise" if level == 1 else "brief"
-                    focus = "main ideas and relationships" if level == 1 else "core message"
-                    
-                    prompt = f"""Generate a {level_type} summary of the following text.
-Focus on {focus}.
-Length: approximately {tokens} tokens.
-Context: {context}
-
-Text: {content}"""
-                    
-                    result = await self.venice.generate(prompt=prompt, temperature=0.3)
-                    summary_text = result["choices"][0]["text"]
-                    embedding = await self.venice.embed(summary_text)
-                    vector_id = f"summary_{hashlib.sha256(summary_text.encode()).hexdigest()}"
-                    
-                    summaries.append({
-                        "level": SummaryLevel.CONCISE if level == 1 else SummaryLevel.BRIEF,
-                        "content": summary_text,
-                        "vector": embedding["data"][0]["embedding"],
-                        "vector_id": vector_id
-                    })
+            summaries = [
+                {
+                    "level": level,
+                    "content": summary_text,
+                    "vector": embedding,
+                    "vector_id": f"summary_{hashlib.sha256(summary_text.encode()).hexdigest()}"
+                }
+                for (level, *_), summary_text, embedding in zip(levels, summary_texts, embeddings)
+            ]
         except Exception as e:
-            print(f"Error generating summary: {str(e)}")
+            logger.exception("Error generating summary at depth %d", depth)
             raise
         
         if summaries:
             await self._summary_cache.set(cache_key, summaries)
         return summaries
     
+    async def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        # Only texts not embedded before are sent, all in one request
+        keys = [hashlib.blake2b(text.encode(), digest_size=16, usedforsecurity=False).digest() for text in texts]
+        embeddings = {key: await self._embedding_cache.get(key) for key in keys}
+        missing = [(key, text) for key, text in dict(zip(keys, texts)).items() if embeddings[key] is None]
+        if missing:
+            result = await self.venice.embed([text for _, text in missing])
+            data = result["data"]
+            if len(data) != len(missing):
+                raise RuntimeError(f"Embedding API returned {len(data)} embeddings for {len(missing)} texts")
+            if all("index" in item for item in data):
+                data = sorted(data, key=lambda item: item["index"])
+            for (key, _), item in zip(missing, data):
+                embeddings[key] = item["embedding"]
+                await self._embedding_cache.set(key, item["embedding"])
+        return [embeddings[key] for key in keys]
+    
+    async def _bounded(self, coro: Awaitable[T]) -> T:
+        async with self._task_semaphore:
+            return await coro
+    
+    async def _summarize_chapter(self, chapter_key: str, chapter: str, context: str) -> List[Dict[str, Any]]:
+        # Keyed by chapter text alone so identical chapters in other books hit the cache too
+        cached = await self._summary_cache.get(chapter_key)
+        if cached:
+            return cached
+        summaries = await self.generate_hierarchical_summary(chapter, depth=1, context=context)
+        if summaries:
+            await self._summary_cache.set(chapter_key, summaries)
+        return summaries
+    
     async def process_book_content(self, content: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Process a book's content to generate hierarchical summaries at chapter and book levels."""
-        cache_key = f"summary_{hashlib.sha256(content.encode()).hexdigest()}"
+        # Reuse the stored Book.content_hash when the caller has one
+        content_hash = metadata.get("content_hash") or _hash_text(content).hexdigest()
+        cache_key = f"summary_{content_hash}"
         cached = await self._summary_cache.get(cache_key)
         if cached:
             return cached
 
-        chapters = self._split_into_chapters(content)
         summaries = []
+        title = metadata.get('title', 'Unknown')
         
         try:
-            # Always generate DETAILED summary first
-            detailed_summary = await self.generate_hierarchical_summary(
-                content,
-                depth=1,
-                context=f"Detailed summary of: {metadata.get('title', 'Unknown')}"
-            )
+            # The whole-book detailed summary, every chapter and the book-level
+            # summary are independent, so they are all requested together
+            # Repeated chapters (boilerplate notes, prefaces) are summarized once
+            chapter_keys = []
+            chapter_tasks = {}
+            for idx, chapter in enumerate(self._split_into_chapters(content)):
+                chapter_key = f"chapter_{_hash_text(chapter).hexdigest()}"
+                chapter_keys.append(chapter_key)
+                if chapter_key not in chapter_tasks:
+                    chapter_tasks[chapter_key] = self._summarize_chapter(
+                        chapter_key, chapter, f"Chapter {idx + 1} of {title}"
+                    )
+            chapter_count = len(chapter_keys)
+            tasks = [
+                self.generate_hierarchical_summary(content, depth=1, context=f"Detailed summary of: {title}"),
+                *chapter_tasks.values()
+            ]
+            if chapter_count > 1:
+                tasks.append(self.generate_hierarchical_summary(
+                    content, depth=2, context=f"Full book: {title} by {metadata.get('author', 'Unknown')}"
+                ))
+            results = await asyncio.gather(*(self._bounded(task) for task in tasks), return_exceptions=True)
+            detailed_summary = results[0]
+            unique_summaries = dict(zip(chapter_tasks, results[1:len(chapter_tasks) + 1]))
+            chapter_summaries = [unique_summaries[chapter_key] for chapter_key in chapter_keys]
+            
+            # Whole-book DETAILED summary comes first
+            if isinstance(detailed_summary, Exception):
+                raise detailed_summary
             if detailed_summary:
                 detailed_summary[0]["summary_type"] = SummaryType.CHAPTER
                 detailed_summary[0]["chapter_index"] = 0
@@ -114,78 +203,55 @@ Text: {content}"""
                 summaries.extend(detailed_summary)
             
             # Chapter-level summaries
-            for idx, chapter in enumerate(chapters):
-                try:
-                    chapter_summary = await self.generate_hierarchical_summary(
-                        chapter,
-                        depth=1,
-                        context=f"Chapter {idx + 1} of {metadata.get('title', 'Unknown')}"
-                    )
-                    for summary in chapter_summary:
-                        summary["summary_type"] = SummaryType.CHAPTER
-                        summary["chapter_index"] = idx
-                        summary["level"] = SummaryLevel.DETAILED
-                    summaries.extend(chapter_summary)
-                except Exception as e:
-                    print(f"Error processing chapter {idx}: {str(e)}")
+            for idx, chapter_summary in enumerate(chapter_summaries):
+                if isinstance(chapter_summary, Exception):
+                    logger.error("Error processing chapter %d: %s", idx, chapter_summary)
                     if idx == 0:  # Re-raise first chapter error to maintain test behavior
-                        raise
+                        raise chapter_summary
                     continue
+                # Copied so repeated chapters each get their own chapter_index
+                chapter_summary = [dict(summary) for summary in chapter_summary]
+                for summary in chapter_summary:
+                    summary["summary_type"] = SummaryType.CHAPTER
+                    summary["chapter_index"] = idx
+                    summary["level"] = SummaryLevel.DETAILED
+                summaries.extend(chapter_summary)
             
             # Additional summary levels if needed
-            if len(chapters) > 1:
-                try:
-                    book_summary = await self.generate_hierarchical_summary(
-                        content,
-                        depth=2,
-                        context=f"Full book: {metadata.get('title', 'Unknown')} by {metadata.get('author', 'Unknown')}"
-                    )
+            if chapter_count > 1:
+                book_summary = results[-1]
+                if isinstance(book_summary, Exception):
+                    logger.error("Error generating book summary: %s", book_summary)
+                    if not summaries:  # Re-raise if no summaries generated
+                        raise book_summary
+                else:
                     for summary in book_summary:
                         summary["summary_type"] = SummaryType.BOOK
                         summary["chapter_index"] = None
                         summary["level"] = SummaryLevel.CONCISE if summary["level"] == SummaryLevel.CONCISE else SummaryLevel.BRIEF
                     summaries.extend(book_summary)
-                except Exception as e:
-                    print(f"Error generating book summary: {str(e)}")
-                    if not summaries:  # Re-raise if no summaries generated
-                        raise
             
             await self._summary_cache.set(cache_key, summaries)
             return summaries
         except Exception as e:
             raise e  # Preserve original error
     
-    def _split_into_chapters(self, content: str) -> List[str]:
-        import re
-        
-        chapter_patterns = [
-            r"^Chapter\s+\d+",
-            r"^CHAPTER\s+\d+",
-            r"^\d+\.\s+[A-Z]",
-            r"^Part\s+\d+",
-            r"^Section\s+\d+",
-            r"^Book\s+\d+",
-            r"^Volume\s+\d+",
-            r"^\d+\s*$"
-        ]
-        
-        combined_pattern = '|'.join(f'({pattern})' for pattern in chapter_patterns)
-        regex = re.compile(combined_pattern, re.MULTILINE)
-        
-        # Find all chapter start positions
-        matches = list(regex.finditer(content))
-        if not matches:
-            return [content]
-            
-        chapters = []
-        for i, match in enumerate(matches):
+    def _split_into_chapters(self, content: str) -> Iterator[str]:
+        # Yield each chapter as soon as the next heading is found
+        start = None
+        for match in _CHAPTER_REGEX.finditer(content):
+            if start is not None:
+                chapter_content = content[start:match.start()].strip()
+                if chapter_content:
+                    yield chapter_content
             start = match.start()
-            end = matches[i + 1].start() if i < len(matches) - 1 else len(content)
-            chapter_content = content[start:end].strip()
-            if chapter_content:
-                chapters.append(chapter_content)
-                
-        return chapters
+        
+        if start is None:
+            yield content
+            return
+        chapter_content = content[start:].strip()
+        if chapter_content:
+            yield chapter_content
     
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         if not self.is_active:
@@ -206,19 +272,19 @@ Text: {content}"""
             
             # Save summaries to database
             if "book_id" in metadata:
-                summary_objects = [
-                    Summary(
-                        book_id=metadata["book_id"],
-                        level=summary_data["level"],
-                        content=summary_data["content"],
-                        vector_id=summary_data["vector_id"],
-                        summary_type=summary_data.get("summary_type", SummaryType.CHAPTER),
-                        chapter_index=summary_data.get("chapter_index")
-                    )
+                rows = [
+                    {
+                        "book_id": metadata["book_id"],
+                        "level": summary_data["level"],
+                        "content": summary_data["content"],
+                        "vector_id": summary_data["vector_id"],
+                        "summary_type": summary_data.get("summary_type", SummaryType.CHAPTER),
+                        "chapter_index": summary_data.get("chapter_index")
+                    }
                     for summary_data in summaries
                 ]
-                self.session.add_all(summary_objects)
-                await self.session.flush()
+                for start in range(0, len(rows), SUMMARY_INSERT_BATCH_SIZE):
+                    await self.session.execute(insert(Summary), rows[start:start + SUMMARY_INSERT_BATCH_SIZE])
             
             return {
                 "status": "success",
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Enum, DateTime
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, ForeignKey, Enum, DateTime, JSON, Index
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 import enum
@@ -14,6 +16,34 @@ class SummaryLevel(enum.Enum):
     CONCISE = 1
     BRIEF = 2
 
+class SmallIntEnum(TypeDecorator):
+    """Stores an integer-valued enum as a SMALLINT and loads it back as the enum member.
+    
+    Columns created before the switch to SMALLINT keep working only on SQLite, where they
+    are plain text. On PostgreSQL the old native ENUM column rejects SMALLINT values, so it
+    must be altered to SMALLINT before this type can write to it.
+    """
+    impl = SmallInteger
+    cache_ok = True
+    
+    def __init__(self, enum_class, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enum_class = enum_class
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self.enum_class(value).value
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            # Legacy SQLite rows hold the member name ('DETAILED'), and SQLite returns
+            # later writes to such a VARCHAR column as digit strings
+            return self.enum_class(int(value)) if value.isdigit() else self.enum_class[value]
+        return self.enum_class(value)
+
 class Book(Base):
     __tablename__ = 'books'
     
@@ -21,19 +51,22 @@ class Book(Base):
     title = Column(String(255), nullable=False)
     author = Column(String(255))
     content_hash = Column(String(64), unique=True)
-    book_metadata = Column(Text)
+    book_metadata = Column(JSON().with_variant(JSONB(), "postgresql"))
     vector_id = Column(String(64))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # "Recent books" queries
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     summaries = relationship("Summary", back_populates="book", cascade="all, delete-orphan")
 
 class Summary(Base):
     __tablename__ = 'summaries'
+    __table_args__ = (
+        Index('ix_summary_book_type_level', 'book_id', 'summary_type', 'level'),
+    )
     
     id = Column(Integer, primary_key=True)
     book_id = Column(Integer, ForeignKey('books.id'))
-    level = Column(Enum(SummaryLevel))
+    level = Column(SmallIntEnum(SummaryLevel))
     content = Column(Text)
     vector_id = Column(String(64))
     summary_type = Column(Enum(SummaryType))
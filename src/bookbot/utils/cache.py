@@ -1,76 +1,115 @@
+from collections import OrderedDict
 from functools import wraps
-from typing import Any, Callable, Dict, Optional, TypeVar, Union
-import json
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar, Union
 import hashlib
+import inspect
 import time
 import asyncio
 import sys
+import threading
+from . import serialization
 
 T = TypeVar('T')
 
 class AsyncCache:
-    def __init__(self, ttl: int = 3600, max_size: Optional[int] = None, max_memory_mb: Optional[float] = None):
+    def __init__(
+        self,
+        ttl: int = 3600,
+        max_size: Optional[int] = None,
+        max_memory_mb: Optional[float] = None,
+        size_func: Optional[Callable[[Any], int]] = None
+    ):
         self.ttl = ttl
         self.max_size = max_size
         self.max_memory_mb = max_memory_mb
-        self.cache: Dict[str, tuple[Any, float, int]] = {}
-        self.lock = asyncio.Lock()
+        # Byte estimate for a value; the default walks the whole object, which is slow for large values
+        self._size_func = size_func or self._estimate_size
+        # Second-chance (CLOCK) order: eviction starts at the front, and entries read
+        # since they were last passed over are moved to the back once instead of evicted
+        self.cache: OrderedDict[Hashable, tuple[Any, float, int]] = OrderedDict()
+        self._referenced: set = set()
+        # The critical sections never await, so a thread lock guards them for every
+        # event loop and thread sharing this cache without ever blocking for long
+        self._lock = threading.Lock()
         self.total_memory = 0
     
-    def _estimate_size(self, obj: Any) -> int:
-        try:
-            return sys.getsizeof(json.dumps(obj))
-        except (TypeError, ValueError):
-            return sys.getsizeof(str(obj))
+    def _estimate_size(self, obj: Any, _seen: Optional[set] = None) -> int:
+        # Sum the in-memory size of the object and everything it contains, counting shared objects once
+        if _seen is None:
+            _seen = set()
+        if id(obj) in _seen:
+            return 0
+        _seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            size += sum(self._estimate_size(k, _seen) + self._estimate_size(v, _seen) for k, v in obj.items())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            size += sum(self._estimate_size(item, _seen) for item in obj)
+        return size
     
-    async def get(self, key: str) -> Optional[Any]:
+    async def get(self, key: Hashable) -> Optional[Any]:
         now = time.time()
-        async with self.lock:
+        with self._lock:
             if key in self.cache:
                 value, timestamp, size = self.cache[key]
                 if now - timestamp < self.ttl:
+                    self._referenced.add(key)
                     return value
                 del self.cache[key]
+                self._referenced.discard(key)
                 self.total_memory -= size
         return None
     
-    async def set(self, key: str, value: Any) -> None:
+    async def set(self, key: Hashable, value: Any) -> None:
         now = time.time()
-        size = self._estimate_size(value)
+        # Sizes only matter when there is a memory cap to enforce
+        size = self._size_func(value) if self.max_memory_mb else 0
         
         if self.max_memory_mb and size > self.max_memory_mb * 1024 * 1024:
             return
         
-        async with self.lock:
-            # Remove expired entries
-            expired = [k for k, (_, ts, _) in self.cache.items() if now - ts >= self.ttl]
-            for k in expired:
-                self.total_memory -= self.cache[k][2]
-                del self.cache[k]
+        with self._lock:
+            if key in self.cache:
+                self.total_memory -= self.cache.pop(key)[2]
+                self._referenced.discard(key)
+            
+            # Drop expired entries at the front; others expire lazily in get
+            while self.cache and now - next(iter(self.cache.values()))[1] >= self.ttl:
+                self._pop_front()
             
             # Remove entries if cache is too large
             if self.max_size:
                 while len(self.cache) >= self.max_size and self.cache:
-                    oldest = min(self.cache.items(), key=lambda x: x[1][1])
-                    self.total_memory -= oldest[1][2]
-                    del self.cache[oldest[0]]
+                    self._evict()
             
             # Remove entries if memory limit exceeded
             if self.max_memory_mb:
                 max_bytes = self.max_memory_mb * 1024 * 1024
                 while self.total_memory + size > max_bytes and self.cache:
-                    oldest = min(self.cache.items(), key=lambda x: x[1][1])
-                    self.total_memory -= oldest[1][2]
-                    del self.cache[oldest[0]]
+                    self._evict()
             
-            if key in self.cache:
-                self.total_memory -= self.cache[key][2]
             self.cache[key] = (value, now, size)
             self.total_memory += size
     
+    def _pop_front(self) -> None:
+        key, (_, _, size) = self.cache.popitem(last=False)
+        self._referenced.discard(key)
+        self.total_memory -= size
+    
+    def _evict(self) -> None:
+        # Give referenced entries a second chance; each is skipped at most once
+        while self.cache:
+            key = next(iter(self.cache))
+            if key not in self._referenced:
+                self._pop_front()
+                return
+            self._referenced.discard(key)
+            self.cache.move_to_end(key)
+    
     async def clear(self) -> None:
-        async with self.lock:
+        with self._lock:
             self.cache.clear()
+            self._referenced.clear()
             self.total_memory = 0
 
 def async_cache(
@@ -81,21 +120,48 @@ def async_cache(
     cache = ttl if isinstance(ttl, AsyncCache) else AsyncCache(ttl, max_size, max_memory_mb)
     
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        key_locks: Dict[Hashable, list] = {}  # (loop id, key) -> [lock, callers using it]
+        # Skip self argument for method caching
+        skip_self = next(iter(inspect.signature(func).parameters), None) in ("self", "cls")
+        
         @wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> T:
-            # Skip self argument for method caching
-            cache_args = args[1:] if args and hasattr(args[0], '__class__') else args
-            key = hashlib.sha256(
-                json.dumps([cache_args, kwargs], sort_keys=True).encode()
-            ).hexdigest()
+            cache_args = args[1:] if skip_self and args else args
+            # Hashable arguments are used as the key directly; anything else is serialized.
+            # Types are part of the key, since 1, 1.0 and True are equal and hash alike
+            key = (
+                tuple((type(arg), arg) for arg in cache_args),
+                tuple(sorted((name, type(value), value) for name, value in kwargs.items()))
+            )
+            try:
+                hash(key)
+            except TypeError:
+                key = hashlib.blake2b(
+                    serialization.dumps([cache_args, kwargs], sort_keys=True).encode(), digest_size=16, usedforsecurity=False
+                ).digest()
             
             cached = await cache.get(key)
             if cached is not None:
                 return cached
             
-            result = await func(*args, **kwargs)
-            await cache.set(key, result)
-            return result
+            # Concurrent misses on one key wait for a single call instead of all computing it
+            lock_key = (id(asyncio.get_running_loop()), key)
+            entry = key_locks.get(lock_key)
+            if entry is None:
+                entry = key_locks[lock_key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+            try:
+                async with entry[0]:
+                    cached = await cache.get(key)
+                    if cached is not None:
+                        return cached
+                    result = await func(*args, **kwargs)
+                    await cache.set(key, result)
+                    return result
+            finally:
+                entry[1] -= 1
+                if not entry[1]:
+                    del key_locks[lock_key]
         
         setattr(wrapper, 'cache', cache)
         setattr(wrapper, 'clear_cache', cache.clear)
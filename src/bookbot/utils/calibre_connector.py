@@ -1,110 +1,389 @@
-from typing import Dict, List, Optional, Any, Callable, Awaitable
+from typing import Dict, List, Optional, Any, AsyncIterator, Callable, Awaitable, Tuple, TypeVar
 import sqlite3
-import json
 import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import wraps
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler, FileModifiedEvent
+from watchdog.observers.polling import PollingObserver
+from watchdog.events import FileSystemEvent, FileSystemEventHandler, FileModifiedEvent
+from .cache import AsyncCache
+from . import serialization
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# In WAL mode writes land in metadata.db-wal until a checkpoint
+LIBRARY_DB_FILES = frozenset({"metadata.db", "metadata.db-wal"})
+
+# Quiet period after the last metadata.db write before the library is re-read
+DEBOUNCE_SECONDS = 0.25
+
+_BOOKS_QUERY = """
+    SELECT 
+        books.id,
+        books.title,
+        books.author_sort,
+        books.timestamp,
+        books.pubdate,
+        books.series_index,
+        books.isbn,
+        json_group_array(DISTINCT data.format) FILTER (WHERE data.format IS NOT NULL) as formats,
+        json_group_array(DISTINCT tags.name) FILTER (WHERE tags.name IS NOT NULL) as tags,
+        json_group_object(identifiers.type, identifiers.val) FILTER (WHERE identifiers.type IS NOT NULL) as identifiers,
+        books.path,
+        comments.text as description
+    FROM books
+    LEFT JOIN data ON books.id = data.book
+    LEFT JOIN books_tags_link ON books.id = books_tags_link.book
+    LEFT JOIN tags ON books_tags_link.tag = tags.id
+    LEFT JOIN identifiers ON books.id = identifiers.book
+    LEFT JOIN comments ON books.id = comments.book
+    {where}
+    GROUP BY books.id
+"""
+_SELECT_BOOKS = _BOOKS_QUERY.format(where="")
+# Calibre bumps last_modified on every edit; libraries without it fall back to timestamp
+CHANGE_COLUMNS = ("last_modified", "timestamp")
+_SELECT_BOOKS_SINCE = {
+    column: _BOOKS_QUERY.format(where=f"WHERE books.{column} > ?") for column in CHANGE_COLUMNS
+}
+_BOOK_COLUMNS = "PRAGMA table_info(books)"
+_SELECT_CHANGE_MARK = {column: f"SELECT MAX({column}) FROM books" for column in CHANGE_COLUMNS}
+_SELECT_BOOK_IDS = "SELECT id FROM books"
+_SELECT_BOOKS_BY_IDS = _BOOKS_QUERY.format(where="WHERE books.id IN (SELECT value FROM json_each(?))")
+_TOUCH_BOOK = "UPDATE books SET last_modified = ? WHERE id = ?"
+
+_SELECT_BOOK_FILES = """
+    SELECT format, name
+    FROM data
+    WHERE book = ?
+"""
+
+_INSERT_BOOK = """
+    INSERT INTO books (title, author_sort, path, has_cover, series_index, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_IDENTIFIER = "INSERT INTO identifiers (book, type, val) VALUES (?, ?, ?)"
+
+_INSERT_SERIES = "INSERT OR IGNORE INTO series (name) VALUES (?)"
+
+_INSERT_BOOK_SERIES = """
+    INSERT INTO books_series_link (book, series)
+    SELECT ?, id FROM series WHERE name = ?
+"""
+
+_INSERT_TAG = "INSERT OR IGNORE INTO tags (name) VALUES (?)"
+
+_INSERT_BOOK_TAG = """
+    INSERT OR IGNORE INTO books_tags_link (book, tag)
+    SELECT ?, id FROM tags WHERE name = ?
+"""
+
+_SELECT_BOOK_TAGS = """
+    SELECT tags.name
+    FROM tags
+    JOIN books_tags_link ON tags.id = books_tags_link.tag
+    WHERE books_tags_link.book = ?
+"""
+
+_CREATE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        author_sort TEXT,
+        path TEXT,
+        has_cover BOOL DEFAULT 0,
+        series_index REAL DEFAULT 1.0,
+        timestamp REAL DEFAULT 0.0,
+        pubdate REAL DEFAULT 0.0,
+        isbn TEXT DEFAULT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS books_tags_link (
+        book INTEGER NOT NULL,
+        tag INTEGER NOT NULL,
+        PRIMARY KEY (book, tag),
+        FOREIGN KEY (book) REFERENCES books(id),
+        FOREIGN KEY (tag) REFERENCES tags(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS identifiers (
+        id INTEGER PRIMARY KEY,
+        book INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        val TEXT NOT NULL,
+        FOREIGN KEY (book) REFERENCES books(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS data (
+        id INTEGER PRIMARY KEY,
+        book INTEGER NOT NULL,
+        format TEXT NOT NULL,
+        name TEXT NOT NULL,
+        FOREIGN KEY (book) REFERENCES books(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS comments (
+        id INTEGER PRIMARY KEY,
+        book INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        FOREIGN KEY (book) REFERENCES books(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS series (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS books_series_link (
+        book INTEGER NOT NULL,
+        series INTEGER NOT NULL,
+        PRIMARY KEY (book, series),
+        FOREIGN KEY (book) REFERENCES books(id),
+        FOREIGN KEY (series) REFERENCES series(id)
+    );
+
+    -- Child tables joined by book in the books query; the link tables are covered by their primary keys
+    CREATE INDEX IF NOT EXISTS data_book_idx ON data (book);
+    CREATE INDEX IF NOT EXISTS identifiers_book_idx ON identifiers (book);
+    CREATE INDEX IF NOT EXISTS comments_book_idx ON comments (book);
+"""
+
+# Applied once per connection; WAL lets readers proceed while Calibre writes
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",  # Wait out Calibre's own writes instead of failing with SQLITE_BUSY
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64MB page cache
+)
+
+# Read-only connections need no journal_mode; the writer switches the file to WAL
+_READER_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16384",  # 16MB page cache per reader
+)
+
+# Read-only connections pooled alongside the single writer
+READER_COUNT = 4
+
+# Rows fetched per worker-thread round trip in get_books_iter
+BOOK_FETCH_SIZE = 256
+
+# Rough in-memory size of one parsed result row. Entries are sized by row count, since
+# walking a whole library's worth of books on every set would block the event loop
+RESULT_ROW_BYTES = 2048
+
+def _result_size(result: Any) -> int:
+    return RESULT_ROW_BYTES * max(1, len(result)) if isinstance(result, list) else RESULT_ROW_BYTES
+
+# Shared by all connectors; keys carry the db path and file stamps, so stale entries are never hit
+_READ_CACHE = AsyncCache(ttl=86400, max_size=64, max_memory_mb=64, size_func=_result_size)
+
+def _mtime_cached(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Cache a read method until metadata.db (or its WAL) changes on disk."""
+    @wraps(func)
+    async def wrapper(self: "CalibreConnector", *args: Any) -> T:
+        stamp = self._db_stamp()
+        key = (func.__name__, str(self.db_path), args, stamp)
+        cached = await _READ_CACHE.get(key)
+        if cached is not None:
+            return cached
+        result = await func(self, *args)
+        # Skip caching if the files changed mid-read (including the first WAL switch)
+        if self._db_stamp() == stamp:
+            await _READ_CACHE.set(key, result)
+        return result
+    
+    setattr(wrapper, 'cache', _READ_CACHE)
+    setattr(wrapper, 'clear_cache', _READ_CACHE.clear)
+    return wrapper
+
+def _fetchall(conn: sqlite3.Connection, sql: str, params: tuple) -> List[sqlite3.Row]:
+    return conn.execute(sql, params).fetchall()
+
+def _parse_book_row(row: sqlite3.Row) -> Dict[str, Any]:
+    book = dict(row)
+    
+    # Aggregates arrive as JSON, so values containing commas or colons survive intact
+    book['formats'] = serialization.loads(book['formats'] or '[]')
+    book['tags'] = serialization.loads(book['tags'] or '[]')
+    book['identifiers'] = serialization.loads(book['identifiers'] or '{}')
+    return book
 
 class LibraryWatcher(FileSystemEventHandler):
-    def __init__(self, callback: Callable[[], Awaitable[None]]):
+    def __init__(self, callback: Callable[[], Awaitable[None]], debounce_seconds: float = DEBOUNCE_SECONDS):
         self.callback = callback
-        self._loop = asyncio.get_event_loop()
-        self._queue = asyncio.Queue()
-        self._task = None
-        self._running = True
+        self.debounce_seconds = debounce_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # Set by bind()
+        self._task: Optional[asyncio.Task] = None
+        # Shared with the watchdog thread: events only move the deadline, and the loop
+        # is woken once per burst rather than once per event
+        self._state_lock = threading.Lock()
+        self._deadline = 0.0
+        self._last_run = 0.0  # When the last callback finished
+        self._running = False
         self._shutdown = False
-        
-    async def _process_events(self):
+    
+    async def bind(self) -> None:
+        """Attach to the running loop; events arriving before this are ignored."""
+        self._loop = asyncio.get_running_loop()
+    
+    async def _debounced_run(self):
         try:
-            while not self._shutdown:
-                try:
-                    event = await asyncio.wait_for(self._queue.get(), timeout=0.1)
-                    if event is None:  # Shutdown signal
-                        break
-                    print(f"DEBUG: Processing event: {event}")
+            while True:
+                # Every new event pushes the deadline back, so a burst of writes syncs once,
+                # and runs are always at least one window apart
+                while (delay := max(self._deadline, self._last_run + self.debounce_seconds) - time.monotonic()) > 0:
+                    await asyncio.sleep(delay)
+                started = time.monotonic()
+                if not self._shutdown:
                     try:
-                        if not self._shutdown:
-                            await self.callback()
-                            print("DEBUG: Callback completed successfully")
-                    except Exception as e:
-                        print(f"DEBUG: Callback error: {e}")
+                        await self.callback()
                     finally:
-                        self._queue.task_done()
-                except asyncio.TimeoutError:
-                    if self._shutdown:
-                        break
-                    continue
-                except RuntimeError as e:
-                    if "Event loop is closed" in str(e) or self._shutdown:
-                        break
+                        self._last_run = time.monotonic()
+                    logger.debug("Library change callback completed")
+                # Events that arrived during the callback get one more run
+                with self._state_lock:
+                    if self._shutdown or self._deadline <= started:
+                        self._running = False
+                        return
         except asyncio.CancelledError:
-            print("DEBUG: Event processor cancelled")
-        finally:
+            logger.debug("Library change callback cancelled")
+        except Exception:
+            logger.exception("Library change callback failed")
+        with self._state_lock:
             self._running = False
-            # Drain the queue
-            while not self._queue.empty():
-                try:
-                    self._queue.get_nowait()
-                    self._queue.task_done()
-                except asyncio.QueueEmpty:
-                    break
+    
+    def _start(self) -> None:
+        # Runs on the event loop
+        if self._shutdown:
+            self._running = False
+            return
+        self._task = self._loop.create_task(self._debounced_run())
+    
+    def dispatch(self, event: FileSystemEvent) -> None:
+        # Cover images and book files are dropped before watchdog's per-event dispatch
+        if not event.is_directory and os.path.basename(event.src_path) in LIBRARY_DB_FILES:
+            super().dispatch(event)
     
     def on_modified(self, event: FileModifiedEvent) -> None:
-        if not event.src_path.endswith("metadata.db"):
+        # Calibre keeps the db open between writes, so modify (not close-write) events mark a commit
+        if os.path.basename(event.src_path) not in LIBRARY_DB_FILES or self._loop is None:
             return
             
-        print(f"DEBUG: File modification detected: {event.src_path}")
+        logger.debug("File modification detected: %s", event.src_path)
+        with self._state_lock:
+            self._deadline = time.monotonic() + self.debounce_seconds
+            if self._running or self._shutdown:
+                return
+            self._running = True
         try:
-            # Put the event in the queue
-            future = asyncio.run_coroutine_threadsafe(
-                self._queue.put(event), self._loop
-            )
-            future.result(timeout=1.0)  # Wait for queue put to complete
-            
-            # Start the event processor if not running
-            if self._task is None or self._task.done():
-                self._task = asyncio.run_coroutine_threadsafe(
-                    self._process_events(), self._loop
-                )
-                print("DEBUG: Started event processor task")
-        except Exception as e:
-            print(f"DEBUG: Error in on_modified: {e}")
+            self._loop.call_soon_threadsafe(self._start)
+        except RuntimeError as e:  # Loop already closed
+            logger.debug("Error in on_modified: %s", e)
             
     def cleanup(self):
-        """Clean up the event processor task."""
+        """Cancel any pending debounced callback."""
         self._shutdown = True
-        if self._task and not self._task.done():
+        if self._loop is not None and self._task and not self._task.done():
             try:
-                # Signal shutdown
-                try:
-                    future = asyncio.run_coroutine_threadsafe(
-                        self._queue.put(None), self._loop
-                    )
-                    future.result(timeout=0.1)
-                except Exception:
-                    pass
-                
-                # Cancel the task
                 self._loop.call_soon_threadsafe(self._task.cancel)
-                
-                # Wait briefly for cancellation
-                try:
-                    self._task.result(timeout=0.1)
-                except Exception:
-                    pass
-            finally:
-                self._task = None
-                # Create a new queue to prevent any lingering tasks
-                self._queue = asyncio.Queue()
+            except RuntimeError:
+                pass
+        self._task = None
 
 class CalibreConnector:
     def __init__(self, library_path: Path):
         self.library_path = Path(library_path)
+        # Resolved once; Calibre file names are plain relative names, so children need no resolve()
+        self._library_root = self.library_path.resolve()
         self.db_path = self.library_path / "metadata.db"
         self._lock = asyncio.Lock()
         self._last_sync = None
+        self._conn: Optional[sqlite3.Connection] = None  # Opened on first use, reused until cleanup
+        # Library snapshot kept current by _on_library_change, keyed by Calibre book id
+        self._books: Dict[int, Dict[str, Any]] = {}
+        self._change_mark: Any = None
+        self._change_column: Optional[str] = None
+        self._has_last_modified: Optional[bool] = None  # Checked on the writer thread
+        self._synced_stamp: Optional[tuple] = None  # File stamps as of the last sync
+        # Reads use a pool of read-only connections, which WAL lets run alongside the writer
+        self._readers: asyncio.Queue[sqlite3.Connection] = asyncio.Queue()
+        self._reader_count = 0
+        self._executor, self._read_executor = self._create_executors()
+    
+    @staticmethod
+    def _create_executors() -> Tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+        # A single worker keeps every write on the same thread; threads start on first use
+        return (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="calibre-sqlite"),
+            ThreadPoolExecutor(max_workers=READER_COUNT, thread_name_prefix="calibre-sqlite-read"),
+        )
+    
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    async def _run_read(self, func: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, func, *args)
+    
+    @asynccontextmanager
+    async def _acquire_reader(self) -> AsyncIterator[sqlite3.Connection]:
+        if self._readers.empty() and self._reader_count < READER_COUNT:
+            self._reader_count += 1
+            try:
+                # Open the writer first so the file is already in WAL mode
+                async with self._lock:
+                    await self._run(self._get_conn)
+                conn = await self._run_read(self._connect_reader)
+            except BaseException:
+                self._reader_count -= 1
+                raise
+        else:
+            conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+    
+    def _connect_reader(self) -> sqlite3.Connection:
+        uri = f"{(self._library_root / self.db_path.name).as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in _READER_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    async def _read(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        async with self._acquire_reader() as conn:
+            return await self._run_read(_fetchall, conn, sql, params)
+    
+    def _get_conn(self) -> sqlite3.Connection:
+        # Only used while holding self._lock, from the connector's worker thread
+        if self._conn is None:
+            # Writes open with BEGIN IMMEDIATE so the write lock is taken up front, not on first write
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level="IMMEDIATE")
+            conn.row_factory = sqlite3.Row
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._conn = conn
+        return self._conn
         
     async def initialize(self) -> None:
         """Initialize the Calibre connector."""
@@ -113,270 +392,218 @@ class CalibreConnector:
             
         # Create initial database if it doesn't exist
         if not self.db_path.exists():
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            # Create basic schema
-            cursor.executescript("""
-                CREATE TABLE IF NOT EXISTS books (
-                    id INTEGER PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    author_sort TEXT,
-                    path TEXT,
-                    has_cover BOOL DEFAULT 0,
-                    series_index REAL DEFAULT 1.0,
-                    timestamp REAL DEFAULT 0.0,
-                    pubdate REAL DEFAULT 0.0,
-                    isbn TEXT DEFAULT NULL
-                );
-                
-                CREATE TABLE IF NOT EXISTS tags (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL UNIQUE
-                );
-                
-                CREATE TABLE IF NOT EXISTS books_tags_link (
-                    book INTEGER NOT NULL,
-                    tag INTEGER NOT NULL,
-                    PRIMARY KEY (book, tag),
-                    FOREIGN KEY (book) REFERENCES books(id),
-                    FOREIGN KEY (tag) REFERENCES tags(id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS identifiers (
-                    id INTEGER PRIMARY KEY,
-                    book INTEGER NOT NULL,
-                    type TEXT NOT NULL,
-                    val TEXT NOT NULL,
-                    FOREIGN KEY (book) REFERENCES books(id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS data (
-                    id INTEGER PRIMARY KEY,
-                    book INTEGER NOT NULL,
-                    format TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    FOREIGN KEY (book) REFERENCES books(id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS comments (
-                    id INTEGER PRIMARY KEY,
-                    book INTEGER NOT NULL,
-                    text TEXT NOT NULL,
-                    FOREIGN KEY (book) REFERENCES books(id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS series (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL UNIQUE
-                );
-                
-                CREATE TABLE IF NOT EXISTS books_series_link (
-                    book INTEGER NOT NULL,
-                    series INTEGER NOT NULL,
-                    PRIMARY KEY (book, series),
-                    FOREIGN KEY (book) REFERENCES books(id),
-                    FOREIGN KEY (series) REFERENCES series(id)
-                );
-            """)
-            conn.commit()
-            conn.close()
+            async with self._lock:
+                await self._run(self._create_schema)
             
+    def _create_schema(self) -> None:
+        self._get_conn().executescript(_CREATE_SCHEMA)
+    
     async def add_book(self, book_data: Dict[str, Any]) -> Dict[str, Any]:
         """Add a book to the Calibre database."""
+        result = await self.add_books([book_data])
+        if result["status"] == "success":
+            return {"status": "success", "book_id": result["book_ids"][0]}
+        return result
+    
+    async def add_books(self, books: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Add several books in one transaction; on error none of them are added."""
         async with self._lock:
-            conn = sqlite3.connect(str(self.db_path))
-            try:
+            result = await self._run(self._add_books, books)
+        # File stamps can be too coarse to tell back-to-back writes apart
+        await _READ_CACHE.clear()
+        return result
+    
+    def _add_books(self, books: List[Dict[str, Any]]) -> Dict[str, Any]:
+        conn = self._get_conn()
+        try:
+            with conn:  # Commits once, or rolls back on error
                 cursor = conn.cursor()
-                
-                # Add to books table
-                cursor.execute("""
-                    INSERT INTO books (title, author_sort, path, has_cover, series_index, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    book_data["title"],
-                    book_data.get("author", "Unknown"),
-                    book_data.get("path", ""),
-                    0,  # has_cover
-                    book_data.get("series_index", 1.0),
-                    book_data.get("last_modified", datetime.now()).timestamp()
-                ))
-                book_id = cursor.lastrowid
-                
-                # Add identifiers
-                if "identifiers" in book_data:
-                    for id_type, id_val in book_data["identifiers"].items():
-                        cursor.execute("""
-                            INSERT INTO identifiers (book, type, val)
-                            VALUES (?, ?, ?)
-                        """, (book_id, id_type, id_val))
-                
-                # Add tags
-                if "tags" in book_data:
-                    for tag in book_data["tags"]:
-                        cursor.execute("INSERT OR IGNORE INTO tags (name) VALUES (?)", (tag,))
-                        cursor.execute("SELECT id FROM tags WHERE name = ?", (tag,))
-                        tag_id = cursor.fetchone()[0]
-                        cursor.execute("""
-                            INSERT INTO books_tags_link (book, tag)
-                            VALUES (?, ?)
-                        """, (book_id, tag_id))
-                
-                # Add series
-                if "series" in book_data:
-                    cursor.execute("INSERT OR IGNORE INTO series (name) VALUES (?)", (book_data["series"],))
-                    cursor.execute("SELECT id FROM series WHERE name = ?", (book_data["series"],))
-                    series_id = cursor.fetchone()[0]
-                    cursor.execute("""
-                        INSERT INTO books_series_link (book, series)
-                        VALUES (?, ?)
-                    """, (book_id, series_id))
-                
-                conn.commit()
-                return {"status": "success", "book_id": book_id}
-                
-            except Exception as e:
-                conn.rollback()
-                return {"status": "error", "message": str(e)}
-            finally:
-                conn.close()
+                book_ids = [self._insert_book(cursor, book_data) for book_data in books]
+                self._touch_books(conn, book_ids)
+            return {"status": "success", "book_ids": book_ids}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
     
+    def _touch_books(self, conn: sqlite3.Connection, book_ids: List[int]) -> None:
+        # Incremental sync finds edits by last_modified; Calibre's schema has it, the connector's does not
+        if self._has_last_modified is None:
+            self._has_last_modified = any(row[1] == "last_modified" for row in conn.execute(_BOOK_COLUMNS))
+        if self._has_last_modified:
+            now = datetime.now(timezone.utc).isoformat(sep=" ")
+            conn.executemany(_TOUCH_BOOK, [(now, book_id) for book_id in dict.fromkeys(book_ids)])
+    
+    @staticmethod
+    def _insert_book(cursor: sqlite3.Cursor, book_data: Dict[str, Any]) -> int:
+        # Add to books table
+        cursor.execute(_INSERT_BOOK, (
+            book_data["title"],
+            book_data.get("author", "Unknown"),
+            book_data.get("path", ""),
+            0,  # has_cover
+            book_data.get("series_index", 1.0),
+            book_data.get("last_modified", datetime.now()).timestamp()
+        ))
+        book_id = cursor.lastrowid
+        
+        # Add identifiers
+        if "identifiers" in book_data:
+            cursor.executemany(_INSERT_IDENTIFIER, [
+                (book_id, id_type, id_val) for id_type, id_val in book_data["identifiers"].items()
+            ])
+        
+        # Add tags
+        if "tags" in book_data:
+            tags = list(dict.fromkeys(book_data["tags"]))
+            cursor.executemany(_INSERT_TAG, [(tag,) for tag in tags])
+            cursor.executemany(_INSERT_BOOK_TAG, [(book_id, tag) for tag in tags])
+        
+        # Add series
+        if "series" in book_data:
+            cursor.execute(_INSERT_SERIES, (book_data["series"],))
+            cursor.execute(_INSERT_BOOK_SERIES, (book_id, book_data["series"]))
+        
+        return book_id
+    
+    def _db_stamp(self) -> tuple:
+        # Writes land in the WAL until a checkpoint, so both files mark a change
+        stamp = []
+        for path in (self.db_path, self.db_path.with_name("metadata.db-wal")):
+            try:
+                stat = path.stat()
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+    
+    @_mtime_cached
     async def get_books(self) -> List[Dict[str, Any]]:
-        async with self._lock:
-            conn = sqlite3.connect(str(self.db_path))
+        return [book async for book in self.get_books_iter()]
+    
+    async def get_books_iter(self, sql: str = _SELECT_BOOKS, params: tuple = ()) -> AsyncIterator[Dict[str, Any]]:
+        """Yield books one at a time as rows are read, without materializing the result set."""
+        # The reader is held until the result set is exhausted; other queries use the rest of the pool
+        async with self._acquire_reader() as conn:
+            cursor = await self._run_read(conn.execute, sql, params)
             try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT 
-                        books.id,
-                        books.title,
-                        books.author_sort,
-                        books.timestamp,
-                        books.pubdate,
-                        books.series_index,
-                        books.isbn,
-                        GROUP_CONCAT(DISTINCT data.format) as formats,
-                        GROUP_CONCAT(DISTINCT tags.name) as tags,
-                        GROUP_CONCAT(DISTINCT identifiers.type || ':' || identifiers.val) as identifiers,
-                        books.path,
-                        comments.text as description
-                    FROM books
-                    LEFT JOIN data ON books.id = data.book
-                    LEFT JOIN books_tags_link ON books.id = books_tags_link.book
-                    LEFT JOIN tags ON books_tags_link.tag = tags.id
-                    LEFT JOIN identifiers ON books.id = identifiers.book
-                    LEFT JOIN comments ON books.id = comments.book
-                    GROUP BY books.id
-                """)
-                
-                columns = [description[0] for description in cursor.description]
-                books = []
-                
-                for row in cursor.fetchall():
-                    book = dict(zip(columns, row))
-                    
-                    # Parse formats and tags from concatenated strings
-                    book['formats'] = book['formats'].split(',') if book['formats'] else []
-                    book['tags'] = book['tags'].split(',') if book['tags'] else []
-                    
-                    # Parse identifiers into a dictionary
-                    identifiers = {}
-                    if book['identifiers']:
-                        for identifier in book['identifiers'].split(','):
-                            try:
-                                id_type, id_val = identifier.split(':', 1)
-                                identifiers[id_type] = id_val
-                            except ValueError:
-                                continue
-                    book['identifiers'] = identifiers
-                    
-                    books.append(book)
+                while rows := await self._run_read(cursor.fetchmany, BOOK_FETCH_SIZE):
+                    for row in rows:
+                        yield _parse_book_row(row)
                 
                 self._last_sync = datetime.now()
-                return books
             finally:
-                conn.close()
+                cursor.close()
     
+    @_mtime_cached
     async def get_book_files(self, book_id: int) -> List[Dict[str, str]]:
-        async with self._lock:
-            conn = sqlite3.connect(str(self.db_path))
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT format, name
-                    FROM data
-                    WHERE book = ?
-                """, (book_id,))
-                
-                return [
-                    {
-                        'format': row[0],
-                        'path': (self.library_path / row[1]).resolve()
-                    }
-                    for row in cursor.fetchall()
-                ]
-            finally:
-                conn.close()
+        rows = await self._read(_SELECT_BOOK_FILES, (book_id,))
+        return [
+            {
+                'format': row[0],
+                'path': self._library_root / row[1]
+            }
+            for row in rows
+        ]
     
     @property
     def last_sync_time(self) -> Optional[datetime]:
         return self._last_sync
         
+    async def get_books_since(self, mark: Any) -> List[Dict[str, Any]]:
+        """Books added or changed after the given change mark (see get_change_mark)."""
+        column = await self._get_change_column()
+        return [book async for book in self.get_books_iter(_SELECT_BOOKS_SINCE[column], (mark,))]
+    
+    async def get_change_mark(self) -> Any:
+        column = await self._get_change_column()
+        rows = await self._read(_SELECT_CHANGE_MARK[column])
+        return rows[0][0]
+    
+    async def _get_change_column(self) -> str:
+        if self._change_column is None:
+            rows = await self._read(_BOOK_COLUMNS)
+            names = {row[1] for row in rows}
+            self._change_column = next(column for column in CHANGE_COLUMNS if column in names)
+        return self._change_column
+    
     async def _on_library_change(self) -> None:
-        await self.get_books()
+        # Duplicate notifications (WAL writes touch several files) leave the stamps unchanged
+        stamp = self._db_stamp()
+        if stamp == self._synced_stamp:
+            return
+        await _READ_CACHE.clear()
+        # Take the mark first so rows changed during the read are picked up next time
+        mark = await self.get_change_mark()
+        if self._change_mark is None or await self._get_change_column() != "last_modified":
+            # The timestamp fallback is the creation time, which edits never move, so only
+            # a full read catches every change
+            self._books = {book["id"]: book for book in await self.get_books()}
+        else:
+            ids = {row[0] for row in await self._read(_SELECT_BOOK_IDS)}
+            for book_id in self._books.keys() - ids:
+                del self._books[book_id]
+            # A new book can carry a last_modified older than the mark, so fetch unseen ids as well
+            new_ids = ids - self._books.keys()
+            changed = await self.get_books_since(self._change_mark)
+            if new_ids:
+                changed += [
+                    book async for book in self.get_books_iter(_SELECT_BOOKS_BY_IDS, (serialization.dumps(sorted(new_ids)),))
+                ]
+            for book in changed:
+                self._books[book["id"]] = book
+        self._change_mark = mark
+        self._synced_stamp = stamp
     
-    async def watch_library(self) -> tuple[Observer, LibraryWatcher]:
-        observer = Observer()
+    async def watch_library(self, poll_interval: Optional[float] = None) -> tuple[Observer, LibraryWatcher]:
+        """Watch metadata.db for changes.
+        
+        Pass poll_interval for network mounts, where native (inotify) events are not delivered.
+        """
+        observer = PollingObserver(timeout=poll_interval) if poll_interval else Observer()
         event_handler = LibraryWatcher(self._on_library_change)
+        await event_handler.bind()
         observer.schedule(event_handler, str(self.library_path), recursive=False)
         observer.start()
-        print("DEBUG: Started watching library")
+        logger.debug("Started watching library %s", self.library_path)
         return observer, event_handler
     
     async def tag_book(self, book_id: int, tag: str) -> Dict[str, Any]:
+        return await self.tag_books([(book_id, tag)])
+    
+    async def tag_books(self, pairs: List[Tuple[int, str]]) -> Dict[str, Any]:
+        """Apply (book_id, tag) pairs in one transaction."""
         async with self._lock:
-            conn = sqlite3.connect(str(self.db_path))
-            try:
-                cursor = conn.cursor()
-                
-                # Get or create tag
-                cursor.execute("SELECT id FROM tags WHERE name = ?", (tag,))
-                tag_result = cursor.fetchone()
-                if not tag_result:
-                    cursor.execute("INSERT INTO tags (name) VALUES (?)", (tag,))
-                    tag_id = cursor.lastrowid
-                else:
-                    tag_id = tag_result[0]
-                
-                # Add tag to book
-                cursor.execute("""
-                    INSERT OR IGNORE INTO books_tags_link (book, tag)
-                    VALUES (?, ?)
-                """, (book_id, tag_id))
-                
-                conn.commit()
-                return {"status": "success"}
-            except Exception as e:
-                conn.rollback()
-                return {"status": "error", "message": str(e)}
-            finally:
-                conn.close()
+            result = await self._run(self._tag_books, pairs)
+        await _READ_CACHE.clear()
+        return result
+    
+    def _tag_books(self, pairs: List[Tuple[int, str]]) -> Dict[str, Any]:
+        conn = self._get_conn()
+        try:
+            with conn:  # Commits once, or rolls back on error
+                conn.executemany(_INSERT_TAG, [(tag,) for tag in dict.fromkeys(tag for _, tag in pairs)])
+                conn.executemany(_INSERT_BOOK_TAG, pairs)
+                self._touch_books(conn, [book_id for book_id, _ in pairs])
+            return {"status": "success"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
                 
+    @_mtime_cached
     async def get_book_tags(self, book_id: int) -> List[str]:
-        async with self._lock:
-            conn = sqlite3.connect(str(self.db_path))
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT tags.name
-                    FROM tags
-                    JOIN books_tags_link ON tags.id = books_tags_link.tag
-                    WHERE books_tags_link.book = ?
-                """, (book_id,))
-                return [row[0] for row in cursor.fetchall()]
-            finally:
-                conn.close()
+        rows = await self._read(_SELECT_BOOK_TAGS, (book_id,))
+        return [row[0] for row in rows]
                 
     async def cleanup(self) -> None:
         """Clean up resources."""
-        pass  # No resources to clean up currently
+        async with self._lock:
+            if self._conn is not None:
+                await self._run(self._conn.close)
+                self._conn = None
+        # Readers still checked out are returned to the queue and closed by a later cleanup
+        while not self._readers.empty():
+            await self._run_read(self._readers.get_nowait().close)
+            self._reader_count -= 1
+        
+        # Stop the worker threads; fresh executors let the connector be used again
+        for executor in (self._executor, self._read_executor):
+            executor.shutdown(wait=False)
+        self._executor, self._read_executor = self._create_executors()
@@ -1,4 +1,5 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple, TypeVar
+import asyncio
 import os
 import ebooklib
 from ebooklib import epub
@@ -7,12 +8,27 @@ import hashlib
 import json
 import logging
 
+T = TypeVar('T')
+
+# Books parsed at once; parsing runs in worker threads so the event loop stays free
+MAX_PARSE_WORKERS = os.cpu_count() or 4
+
 class EPUBProcessor:
-    def __init__(self, max_chunk_size: int = 1000):
+    def __init__(self, max_chunk_size: int = 1000, max_workers: Optional[int] = None):
         self.max_chunk_size = max_chunk_size
-        self.html_converter = html2text.HTML2Text()
-        self.html_converter.ignore_images = True
-        self.html_converter.ignore_tables = True
+        self._parse_semaphore = asyncio.Semaphore(max_workers or MAX_PARSE_WORKERS)
+    
+    @staticmethod
+    def _make_html_converter() -> html2text.HTML2Text:
+        # HTML2Text keeps parser state, so each worker thread needs its own
+        converter = html2text.HTML2Text()
+        converter.ignore_images = True
+        converter.ignore_tables = True
+        return converter
+    
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        async with self._parse_semaphore:
+            return await asyncio.to_thread(func, *args)
     
     def _safe_get_metadata(self, book: epub.EpubBook, metadata_type: str, default: Any = None) -> Any:
         try:
@@ -22,6 +38,40 @@ class EPUBProcessor:
             return default
 
     async def process_file(self, file_path: str) -> Dict[str, Any]:
+        return await self._run(self._process_file_sync, file_path)
+    
+    def _process_file_sync(self, file_path: str) -> Dict[str, Any]:
+        metadata, full_content = self._read_book(file_path)
+        content_hash = hashlib.sha256(full_content.encode()).hexdigest()
+        
+        chunks = self._chunk_content(full_content)
+        
+        return {
+            "metadata": metadata,
+            "content": full_content,
+            "content_hash": content_hash,
+            "chunks": chunks
+        }
+    
+    async def stream_file(self, file_path: str) -> Dict[str, Any]:
+        """Like process_file, but "chunks" is an iterator and the full text is not returned.
+        
+        The content hash covers the whole text, so the worker thread still reads and splits
+        the whole book. Peak memory is not lower than process_file; iterating the chunks
+        just does no parsing on the event loop.
+        """
+        metadata, chunks, content_hash = await self._run(self._read_and_chunk, file_path)
+        return {
+            "metadata": metadata,
+            "content_hash": content_hash,
+            "chunks": iter(chunks)
+        }
+    
+    def _read_and_chunk(self, file_path: str) -> Tuple[Dict[str, Any], List[str], str]:
+        metadata, full_content = self._read_book(file_path)
+        return metadata, self._chunk_content(full_content), hashlib.sha256(full_content.encode()).hexdigest()
+    
+    def _read_book(self, file_path: str) -> Tuple[Dict[str, Any], str]:
         if not os.path.exists(file_path):
             raise RuntimeError(f"EPUB file not found: {file_path}")
 
@@ -106,11 +156,12 @@ class EPUBProcessor:
         }
 
         # Process content from HTML items
+        html_converter = self._make_html_converter()
         content = []
         for item in book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
             if hasattr(item, 'content') and item.content:
                 try:
-                    text = self.html_converter.handle(item.content.decode('utf-8'))
+                    text = html_converter.handle(item.content.decode('utf-8'))
                     content.append(text)
                 except Exception:
                     continue
@@ -118,20 +169,12 @@ class EPUBProcessor:
         if not content:
             raise RuntimeError("Invalid EPUB file: no content found")
         
-        full_content = "\n\n".join(content)
-        content_hash = hashlib.sha256(full_content.encode()).hexdigest()
-        
-        chunks = self._chunk_content(full_content)
-        
-        return {
-            "metadata": metadata,
-            "content": full_content,
-            "content_hash": content_hash,
-            "chunks": chunks
-        }
+        return metadata, "\n\n".join(content)
     
     def _chunk_content(self, content: str) -> List[str]:
-        chunks = []
+        return list(self._iter_chunks(content))
+    
+    def _iter_chunks(self, content: str) -> Iterator[str]:
         current_chunk = []
         current_size = 0
         
@@ -139,7 +182,7 @@ class EPUBProcessor:
             line_size = len(line.split())
             if current_size + line_size > self.max_chunk_size:
                 if current_chunk:
-                    chunks.append('\n'.join(current_chunk))
+                    yield '\n'.join(current_chunk)
                 current_chunk = [line]
                 current_size = line_size
             else:
@@ -147,6 +190,4 @@ class EPUBProcessor:
                 current_size += line_size
         
         if current_chunk:
-            chunks.append('\n'.join(current_chunk))
-        
-        return chunks
+            yield '\n'.join(current_chunk)
@@ -46,6 +46,10 @@ class AsyncRateLimiter:
         self._last_refill = monotonic()
     
     async def acquire(self) -> bool:
+        return await self._try_acquire() is None
+    
+    async def _try_acquire(self) -> Optional[float]:
+        """Take a token and return None, or return how long until one frees up."""
         async with self._lock:
             now = monotonic()
             # Clean expired requests
@@ -54,20 +58,22 @@ class AsyncRateLimiter:
             # Check if under rate limit
             if len(self._requests) < self.config.requests_per_window:
                 self._requests.append(now)
-                return True
+                return None
                 
             # Try to use burst token if available
             if self._burst_tokens > 0:
                 self._burst_tokens -= 1
                 self._requests.append(now)
-                return True
+                return None
                 
-            return False
+            return max(0.0, self.config.window_seconds - (now - self._requests[0]))
     
     async def wait_for_token(self, timeout: Optional[float] = None) -> bool:
         start_time = monotonic()
         while True:
-            if await self.acquire():
+            # The lock is only held while checking; waiters sleep outside it
+            wait_time = await self._try_acquire()
+            if wait_time is None:
                 return True
                 
             if timeout is not None:
@@ -75,7 +81,6 @@ class AsyncRateLimiter:
                 if elapsed >= timeout:
                     return False
                     
-            wait_time = await self.get_time_until_next_token()
             await asyncio.sleep(min(wait_time, self.config.retry_interval))
     
     async def get_current_usage(self) -> Dict[str, int]:
@@ -43,11 +43,8 @@ class VectorStore:
                     async def __call__(self, input: Union[str, List[str]]) -> List[List[float]]:
                         if isinstance(input, str):
                             input = [input]
-                        embeddings = []
-                        for text in input:
-                            result = await self.client.embed(text)
-                            embeddings.append(result["data"][0]["embedding"])
-                        return embeddings
+                        result = await self.client.embed(input)
+                        return [item["embedding"] for item in result["data"]]
                 
                 self.embedding_function = VeniceEmbedding(venice_client)
             else:
@@ -90,10 +87,8 @@ class VectorStore:
                 batch_ids = ids[i:i + self.max_batch_size]
                 
                 if self.venice_client:
-                    embeddings = []
-                    for text in batch_texts:
-                        result = await self.venice_client.embed(text)
-                        embeddings.append(result["data"][0]["embedding"])
+                    result = await self.venice_client.embed(batch_texts)
+                    embeddings = [item["embedding"] for item in result["data"]]
                     
                     self.collection.add(
                         documents=batch_texts,
@@ -115,7 +110,41 @@ class VectorStore:
         except Exception as e:
             logging.error(f"Failed to add texts to vector store: {str(e)}")
             raise
-    
+
+    async def get_ids(
+        self,
+        ids: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """Return which of the given ids, or of the texts matching the filter, are stored."""
+        try:
+            result = self.collection.get(
+                ids=ids,
+                where={k: str(v) for k, v in metadata_filter.items()} if metadata_filter else None,
+                include=[]
+            )
+            return result["ids"]
+        except Exception as e:
+            logging.error(f"Failed to look up ids in vector store: {str(e)}")
+            raise
+
+    async def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Remove the texts with the given ids, or every text matching the filter."""
+        if not ids and not metadata_filter:
+            return
+        try:
+            self.collection.delete(
+                ids=ids,
+                where={k: str(v) for k, v in metadata_filter.items()} if metadata_filter else None
+            )
+        except Exception as e:
+            logging.error(f"Failed to delete from vector store: {str(e)}")
+            raise
+
     async def search(
         self,
         query: str,
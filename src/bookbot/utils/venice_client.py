@@ -2,6 +2,7 @@ from typing import Dict, Any, Optional, List, Union
 import aiohttp
 import json
 import asyncio
+import copy
 import hashlib
 from pathlib import Path
 from pydantic import BaseModel
@@ -9,19 +10,26 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 from .rate_limiter import AsyncRateLimiter, RateLimitConfig
 from .token_tracker import TokenTracker
 from .cache import AsyncCache
+from . import serialization
+
+def _response_format_payload(response_format: str) -> Dict[str, str]:
+    # The API follows the OpenAI schema, which takes an object rather than the bare flag
+    return {"type": "json_object" if response_format == "json" else response_format}
 
 class VeniceConfig(BaseModel):
     api_key: str
     model: str = "venice-xl"
     max_tokens: int = 2048
     temperature: float = 0.7
+    max_concurrency: int = 4  # Concurrent requests an agent may have in flight
     
     def dict(self):
         return {
             "api_key": "***",  # Mask API key in serialization
             "model": self.model,
             "max_tokens": self.max_tokens,
-            "temperature": self.temperature
+            "temperature": self.temperature,
+            "max_concurrency": self.max_concurrency
         }
 
 class VeniceClient:
@@ -73,6 +81,13 @@ class VeniceClient:
             )
         return self._session
     
+    @staticmethod
+    def _generate_key(prompt: str, context: Optional[str], temperature: Optional[float], response_format: Optional[str]) -> bytes:
+        return hashlib.blake2b(
+            json.dumps([prompt, context, temperature, response_format], sort_keys=True).encode(),
+            digest_size=16, usedforsecurity=False
+        ).digest()
+    
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def generate(
         self, 
@@ -82,15 +97,12 @@ class VeniceClient:
         max_tokens: Optional[int] = None,
         response_format: Optional[str] = None
     ) -> Dict[str, Any]:
-        # Generate cache key
-        key = hashlib.sha256(
-            json.dumps([prompt, context, temperature], sort_keys=True).encode()
-        ).hexdigest()
+        key = self._generate_key(prompt, context, temperature, response_format)
         
-        # Check cache
+        # Check cache; callers get their own copy, since parsed JSON results are mutable
         cached = await self._generate_cache.get(key)
         if cached is not None:
-            return cached
+            return copy.deepcopy(cached)
             
         await self._rate_limiter.wait_for_token()
         
@@ -104,7 +116,7 @@ class VeniceClient:
         if context:
             payload["context"] = context
         if response_format:
-            payload["response_format"] = response_format
+            payload["response_format"] = _response_format_payload(response_format)
         
         # For testing purposes, return mock response
         if not self.config.api_key or self.config.api_key == "test_key":
@@ -120,6 +132,8 @@ class VeniceClient:
                     "citations": [],
                     "confidence": 0.0
                 }
+                if response_format == "json":
+                    return {"choices": [{"text": response}]}
                 return {"choices": [{"text": json.dumps(response, sort_keys=True)}]}
         
         async with session.post(
@@ -130,7 +144,7 @@ class VeniceClient:
             if response.status == 429:  # Rate limit exceeded
                 retry_after = int(response.headers.get('Retry-After', 60))
                 await asyncio.sleep(retry_after)
-                return await self.generate(prompt, context, temperature)
+                return await self.generate(prompt, context, temperature, max_tokens, response_format)
             
             if response.status != 200:
                 error_text = await response.text()
@@ -141,16 +155,102 @@ class VeniceClient:
                 len(prompt.split()),  # Approximate token count
                 len(result['choices'][0]['text'].split())
             )
-            await self._generate_cache.set(key, result)
+            if response_format == "json":
+                # Parse once here so callers (and cache hits) get a dict back
+                try:
+                    result['choices'][0]['text'] = serialization.loads(result['choices'][0]['text'])
+                except ValueError:
+                    pass
+            await self._generate_cache.set(key, copy.deepcopy(result))
             return result
     
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def generate_batch(
+        self,
+        prompts: List[str],
+        context: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate completions for several prompts in one request, returned in prompt order."""
+        keys = [self._generate_key(prompt, context, temperature, response_format) for prompt in prompts]
+        results: List[Optional[Dict[str, Any]]] = [
+            copy.deepcopy(await self._generate_cache.get(key)) for key in keys
+        ]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+        
+        async def generate_each() -> List[Dict[str, Any]]:
+            return await asyncio.gather(*(
+                self.generate(prompts[i], context, temperature, max_tokens, response_format) for i in missing
+            ))
+        
+        # Test mode goes through generate's mock responses
+        if not self.config.api_key or self.config.api_key == "test_key":
+            for i, result in zip(missing, await generate_each()):
+                results[i] = result
+            return results
+        
+        await self._rate_limiter.wait_for_token()
+        
+        session = await self._get_session()
+        payload = {
+            "model": self.config.model,
+            "prompt": [prompts[i] for i in missing],
+            "max_tokens": max_tokens or self.config.max_tokens,
+            "temperature": temperature or self.config.temperature
+        }
+        if context:
+            payload["context"] = context
+        if response_format:
+            payload["response_format"] = _response_format_payload(response_format)
+        
+        async with session.post(
+            f"{self.base_url}/completions",
+            headers=self.headers,
+            json=payload
+        ) as response:
+            if response.status == 429:  # Rate limit exceeded
+                retry_after = int(response.headers.get('Retry-After', 60))
+                await asyncio.sleep(retry_after)
+                return await self.generate_batch(prompts, context, temperature, max_tokens, response_format)
+            
+            if response.status in (400, 404, 422):
+                # The endpoint does not take prompt lists; send them one at a time
+                batch_results = await generate_each()
+            elif response.status != 200:
+                error_text = await response.text()
+                raise RuntimeError(f"Venice API error: {error_text}")
+            else:
+                result = await response.json()
+                choices = sorted(result["choices"], key=lambda choice: choice.get("index", 0))
+                batch_results = [{**result, "choices": [choice]} for choice in choices]
+                self._token_tracker.add_usage(
+                    sum(len(prompts[i].split()) for i in missing),  # Approximate token count
+                    sum(len(choice["text"].split()) for choice in choices)
+                )
+                for i, batch_result in zip(missing, batch_results):
+                    if response_format == "json":
+                        try:
+                            batch_result["choices"][0]["text"] = serialization.loads(batch_result["choices"][0]["text"])
+                        except ValueError:
+                            pass
+                    await self._generate_cache.set(keys[i], copy.deepcopy(batch_result))
+        
+        for i, batch_result in zip(missing, batch_results):
+            results[i] = batch_result
+        return results
+    
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def embed(self, input: Union[str, List[str]]) -> Dict[str, Any]:
         # Generate cache key
         if isinstance(input, list):
-            key = hashlib.sha256(json.dumps(input, sort_keys=True).encode()).hexdigest()
+            payload = json.dumps(input, sort_keys=True).encode()
         else:
-            key = hashlib.sha256(input.encode()).hexdigest()
+            payload = input.encode()
+        key = hashlib.blake2b(payload, digest_size=16, usedforsecurity=False).digest()
         
         # Check cache
         cached = await self._embed_cache.get(key)
@@ -161,14 +261,15 @@ class VeniceClient:
         
         # For testing purposes, return mock response
         if not self.config.api_key or self.config.api_key == "test_key":
-            result = {"data": [{"embedding": [0.1, 0.2, 0.3, 0.4, 0.5]}]}
+            count = len(input) if isinstance(input, list) else 1
+            result = {"data": [{"embedding": [0.1, 0.2, 0.3, 0.4, 0.5]} for _ in range(count)]}
             await self._embed_cache.set(key, result)
             return result
             
         session = await self._get_session()
         payload = {
             "model": self.config.model,
-            "input": input if isinstance(input, str) else "\n".join(input)
+            "input": input  # A list is embedded item by item in one request
         }
         
         async with session.post(
@@ -186,8 +287,9 @@ class VeniceClient:
                 raise RuntimeError(f"Venice API error: {error_text}")
             
             result = await response.json()
+            texts = input if isinstance(input, list) else [input]
             self._token_tracker.add_usage(
-                len(input.split()),  # Approximate token count
+                sum(len(text.split()) for text in texts),  # Approximate token count
                 0  # Embeddings don't have output tokens
             )
             await self._embed_cache.set(key, result)
@@ -63,6 +63,20 @@ def mock_chromadb(monkeypatch):
             self.ids.extend(ids or [str(i + start_idx) for i in range(len(documents))])
             return self.ids[-len(documents):]
             
+        def _matching(self, ids=None, where=None):
+            return [
+                i for i, (text_id, metadata) in enumerate(zip(self.ids, self.metadatas))
+                if (ids is None or text_id in ids)
+                and all((metadata or {}).get(k) == v for k, v in (where or {}).items())
+            ]
+            
+        def get(self, ids=None, where=None, include=None):
+            return {"ids": [self.ids[i] for i in self._matching(ids, where)]}
+            
+        def delete(self, ids=None, where=None):
+            for i in reversed(self._matching(ids, where)):
+                del self.texts[i], self.metadatas[i], self.ids[i]
+            
         def query(self, query_texts, n_results=1, where=None, **kwargs):
             if not self.texts:
                 return {
@@ -105,6 +119,7 @@ def event_loop():
         if pending:
             loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
         loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())  # Stop asyncio.to_thread workers
         # Close any remaining aiohttp sessions
         for task in pending:
             if 'aiohttp' in str(task):
@@ -254,6 +269,9 @@ def mock_venice_client(monkeypatch):
                     }]
                 }
 
+        async def generate_batch(self, prompts, *args, **kwargs):
+            return list(await asyncio.gather(*(self.generate(prompt, *args, **kwargs) for prompt in prompts)))
+
         async def embed(self, input: str, *args, **kwargs) -> dict:
             if isinstance(input, list):
                 return {"data": [{"embedding": [0.1, 0.2, 0.3] * 128} for _ in range(len(input))]}
@@ -1,4 +1,5 @@
 import pytest
+import sys
 import asyncio
 from bookbot.utils.cache import async_cache, AsyncCache
 
@@ -33,6 +34,37 @@ async def test_async_cache_max_size():
     assert await cache.get("key2") is not None
     assert await cache.get("key3") is not None
 
+@pytest.mark.asyncio
+async def test_async_cache_second_chance_eviction():
+    cache = AsyncCache(ttl=60, max_size=2)
+    
+    await cache.set("key1", "value1")
+    await cache.set("key2", "value2")
+    assert await cache.get("key1") == "value1"  # key1 is skipped once by eviction
+    assert list(cache.cache) == ["key1", "key2"]  # Hits do not reorder entries
+    await cache.set("key3", "value3")
+    
+    assert await cache.get("key2") is None
+    assert await cache.get("key1") == "value1"
+    assert await cache.get("key3") == "value3"
+
+@pytest.mark.asyncio
+async def test_async_cache_overwrite_and_expiry_order():
+    cache = AsyncCache(ttl=0.2, max_size=2)
+    
+    await cache.set("key1", "value1")
+    await cache.set("key2", "value2")
+    # Overwriting an existing key does not evict the other entry
+    await cache.set("key1", "updated")
+    assert await cache.get("key1") == "updated"
+    assert await cache.get("key2") == "value2"
+    
+    # Expired entries are dropped from the front on the next insert
+    await asyncio.sleep(0.25)
+    await cache.set("key3", "value3")
+    assert list(cache.cache) == ["key3"]
+    assert cache.total_memory == cache.cache["key3"][2]
+
 @pytest.mark.asyncio
 async def test_async_cache_memory_limit():
     cache = AsyncCache(ttl=60, max_memory_mb=0.001)  # 1KB limit
@@ -51,6 +83,27 @@ async def test_async_cache_memory_limit():
     assert await cache.get("key2") is not None
     assert await cache.get("key3") is not None
 
+def test_async_cache_estimate_size():
+    cache = AsyncCache(max_memory_mb=1)
+    text = "x" * 1000
+    
+    # Container contents are counted, and a shared object only once
+    assert cache._estimate_size({"a": [text]}) > sys.getsizeof(text)
+    assert cache._estimate_size([text, text]) == sys.getsizeof([text, text]) + sys.getsizeof(text)
+
+@pytest.mark.asyncio
+async def test_async_cache_size_func():
+    cache = AsyncCache(max_memory_mb=0.001, size_func=len)  # 1KB limit, one byte per item
+    
+    await cache.set("key1", [0] * 600)
+    await cache.set("key2", [0] * 300)
+    assert cache.total_memory == 900
+    
+    # Exceeding the limit evicts the oldest entry
+    await cache.set("key3", [0] * 300)
+    assert await cache.get("key1") is None
+    assert cache.total_memory == 600
+
 @pytest.mark.asyncio
 async def test_async_cache_expiration():
     cache = AsyncCache(ttl=0.1)
@@ -131,3 +184,52 @@ async def test_async_cache_complex_args():
     
     assert result1 == result2
     assert call_count == 1
+
+@pytest.mark.asyncio
+async def test_async_cache_single_flight():
+    call_count = 0
+    
+    @async_cache(ttl=60)
+    async def test_func(x: int) -> int:
+        nonlocal call_count
+        call_count += 1
+        await asyncio.sleep(0.05)
+        return x * 2
+    
+    results = await asyncio.gather(*(test_func(3) for _ in range(10)))
+    
+    assert results == [6] * 10
+    assert call_count == 1
+
+def test_async_cache_multiple_event_loops():
+    import threading
+    cache = AsyncCache(ttl=60, max_size=50, max_memory_mb=1)
+    
+    async def churn(offset):
+        for i in range(2000):
+            await cache.set((offset, i % 200), [i] * 10)
+            await cache.get((offset, (i * 7) % 200))
+    
+    # Loops in separate threads share one cache; eviction and size accounting stay consistent
+    threads = [threading.Thread(target=asyncio.run, args=(churn(offset),)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(cache.cache) <= 50
+    assert cache._referenced <= set(cache.cache)
+    assert cache.total_memory == sum(size for _, _, size in cache.cache.values())
+    assert asyncio.run(cache.get(next(iter(cache.cache)))) is not None
+
+@pytest.mark.asyncio
+async def test_async_cache_key_distinguishes_equal_types():
+    @async_cache(ttl=60)
+    async def describe(value, flag=None):
+        return f"{type(value).__name__}:{type(flag).__name__}"
+    
+    assert await describe(1) == "int:NoneType"
+    assert await describe(True) == "bool:NoneType"
+    assert await describe(1.0) == "float:NoneType"
+    assert await describe(1, flag=1) == "int:int"
+    assert await describe(1, flag=True) == "int:bool"
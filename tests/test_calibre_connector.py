@@ -4,12 +4,13 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
+import time
 import asyncio
 
 if sys.platform.startswith('linux'):
     import uvloop
     asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-from bookbot.utils.calibre_connector import CalibreConnector, LibraryWatcher
+from bookbot.utils.calibre_connector import CalibreConnector, LibraryWatcher, READER_COUNT, _SELECT_BOOKS
 
 @pytest.fixture
 def mock_calibre_db(tmp_path):
@@ -114,6 +115,14 @@ async def test_get_books(mock_calibre_db):
     assert book['identifiers'] == {'isbn': '1234567890'}
     assert book['description'] == 'Test book description'
 
+@pytest.mark.asyncio
+async def test_get_books_iter(mock_calibre_db):
+    connector = CalibreConnector(mock_calibre_db)
+    books = [book async for book in connector.get_books_iter()]
+    
+    assert books == await connector.get_books()
+    assert isinstance(books[0], dict)
+
 @pytest.mark.asyncio
 async def test_get_book_files(mock_calibre_db):
     connector = CalibreConnector(mock_calibre_db)
@@ -156,6 +165,28 @@ async def test_get_book_tags(mock_calibre_db):
     tags = await connector.get_book_tags(999)
     assert tags == []
 
+@pytest.mark.asyncio
+async def test_persistent_connection(mock_calibre_db):
+    connector = CalibreConnector(mock_calibre_db)
+    await connector.get_books()
+    conn = connector._conn
+    
+    await connector.tag_book(1, "another-tag")
+    assert "another-tag" in await connector.get_book_tags(1)
+    assert connector._conn is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    assert conn.isolation_level == "IMMEDIATE"
+    
+    # Links to missing books are rejected and the batch is rolled back
+    result = await connector.tag_books([(1, "rolled-back"), (999, "rolled-back")])
+    assert result["status"] == "error"
+    assert "rolled-back" not in await connector.get_book_tags(1)
+    
+    await connector.cleanup()
+    assert connector._conn is None
+
 @pytest.mark.asyncio
 async def test_library_watcher(mock_calibre_db, caplog):
     import logging
@@ -199,3 +230,322 @@ async def test_library_watcher(mock_calibre_db, caplog):
         observer.stop()
         await asyncio.sleep(0.1)  # Let the observer stop cleanly
         observer.join(timeout=0.5)
+        await connector.cleanup()
+
+@pytest.mark.asyncio
+async def test_library_watcher_debounce(tmp_path):
+    calls = 0
+    
+    async def callback():
+        nonlocal calls
+        calls += 1
+    
+    watcher = LibraryWatcher(callback, debounce_seconds=0.1)
+    await watcher.bind()
+    event = type("Event", (), {"src_path": str(tmp_path / "metadata.db")})()
+    try:
+        # A burst of writes is synced once, after the burst ends
+        for _ in range(5):
+            watcher.on_modified(event)
+            await asyncio.sleep(0.02)
+        assert calls == 0
+        await asyncio.sleep(0.2)
+        assert calls == 1
+        
+        watcher.on_modified(event)
+        await asyncio.sleep(0.2)
+        assert calls == 2
+    finally:
+        watcher.cleanup()
+
+@pytest.mark.asyncio
+async def test_incremental_library_sync(tmp_path):
+    connector = CalibreConnector(tmp_path)
+    await connector.initialize()
+    await connector.add_book({"title": "First", "last_modified": datetime(2024, 1, 1)})
+    
+    await connector._on_library_change()
+    assert [book["title"] for book in connector._books.values()] == ["First"]
+    mark = connector._change_mark
+    
+    await connector.add_book({"title": "Second", "last_modified": datetime(2024, 2, 1)})
+    changed = await connector.get_books_since(mark)
+    assert [book["title"] for book in changed] == ["Second"]
+    
+    await connector._on_library_change()
+    assert sorted(book["title"] for book in connector._books.values()) == ["First", "Second"]
+    assert connector._change_mark > mark
+    await connector.cleanup()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("calibre_schema", [False, True])
+async def test_library_sync_snapshot_tracks_changes(tmp_path, calibre_schema):
+    connector = CalibreConnector(tmp_path)
+    await connector.initialize()
+    if calibre_schema:
+        # Calibre's own schema has last_modified, which allows incremental reads
+        conn = sqlite3.connect(tmp_path / "metadata.db")
+        conn.execute("ALTER TABLE books ADD COLUMN last_modified TIMESTAMP DEFAULT '2000-01-01 00:00:00+00:00'")
+        conn.commit()
+        conn.close()
+    
+    def snapshot():
+        return {book["title"]: sorted(book["tags"]) for book in connector._books.values()}
+    
+    try:
+        await connector.add_books([
+            {"title": "New", "tags": ["a"], "last_modified": datetime(2024, 2, 1)},
+            {"title": "Gone", "last_modified": datetime(2024, 2, 1)},
+        ])
+        await connector._on_library_change()
+        assert snapshot() == {"New": ["a"], "Gone": []}
+        
+        # An edit, a book dated before the last sync, and a delete made outside the connector
+        await connector.tag_book(1, "new-tag")
+        await connector.add_book({"title": "Old", "last_modified": datetime(2024, 1, 1)})
+        conn = sqlite3.connect(tmp_path / "metadata.db")
+        conn.execute("DELETE FROM books WHERE title = 'Gone'")
+        conn.commit()
+        conn.close()
+        await connector._on_library_change()
+        
+        assert snapshot() == {"New": ["a", "new-tag"], "Old": []}
+        assert snapshot() == {book["title"]: sorted(book["tags"]) for book in await connector.get_books()}
+    finally:
+        await connector.cleanup()
+
+@pytest.mark.asyncio
+async def test_tag_books(mock_calibre_db):
+    connector = CalibreConnector(mock_calibre_db)
+    
+    result = await connector.tag_books([(1, "batch-a"), (1, "batch-b"), (1, "test-tag"), (1, "batch-a")])
+    assert result["status"] == "success"
+    assert sorted(await connector.get_book_tags(1)) == ["batch-a", "batch-b", "test-tag"]
+    await connector.cleanup()
+
+@pytest.mark.asyncio
+async def test_read_cache_invalidated_on_db_change(mock_calibre_db):
+    connector = CalibreConnector(mock_calibre_db)
+    
+    await connector.get_book_tags(1)  # Opens the connection, switching the file to WAL
+    tags = await connector.get_book_tags(1)
+    assert await connector.get_book_tags(1) is tags  # Served from the cache
+    
+    # An external write (e.g. Calibre itself) changes the file stamps
+    conn = sqlite3.connect(str(mock_calibre_db / "metadata.db"))
+    conn.execute("INSERT INTO tags (name) VALUES ('external')")
+    conn.execute("INSERT INTO books_tags_link (book, tag) SELECT 1, id FROM tags WHERE name = 'external'")
+    conn.commit()
+    conn.close()
+    
+    assert sorted(await connector.get_book_tags(1)) == ["external", "test-tag"]
+    await connector.cleanup()
+
+@pytest.mark.asyncio
+async def test_get_books_tag_with_comma(mock_calibre_db):
+    connector = CalibreConnector(mock_calibre_db)
+    await connector.tag_book(1, "Fiction, Historical")
+    
+    book = (await connector.get_books())[0]
+    assert sorted(book['tags']) == ["Fiction, Historical", "test-tag"]
+    assert book['formats'] == ['EPUB']
+    assert book['identifiers'] == {'isbn': '1234567890'}
+    await connector.cleanup()
+
+def test_library_watcher_without_loop(tmp_path):
+    async def callback():
+        pass
+    
+    # Constructing outside a running loop is fine; events before bind() are ignored
+    watcher = LibraryWatcher(callback)
+    watcher.on_modified(type("Event", (), {"src_path": str(tmp_path / "metadata.db")})())
+    watcher.cleanup()
+
+@pytest.mark.asyncio
+async def test_get_books_iter_does_not_block_other_queries(mock_calibre_db):
+    connector = CalibreConnector(mock_calibre_db)
+    books = connector.get_books_iter()
+    try:
+        await books.__anext__()
+        # The iterator is suspended mid-result; other reads must still go through
+        tags = await asyncio.wait_for(connector.get_book_tags(1), timeout=1.0)
+        assert tags == ['test-tag']
+    finally:
+        await books.aclose()
+    await connector.cleanup()
+
+def fire_from_thread(watcher, event, count):
+    import threading
+    thread = threading.Thread(target=lambda: [watcher.on_modified(event) for _ in range(count)])
+    thread.start()
+    thread.join()
+
+@pytest.mark.asyncio
+async def test_library_watcher_events_from_thread(tmp_path):
+    calls = 0
+    started = asyncio.Event()
+    release = asyncio.Event()
+    
+    async def callback():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await release.wait()
+    
+    watcher = LibraryWatcher(callback, debounce_seconds=0.05)
+    await watcher.bind()
+    event = type("Event", (), {"src_path": str(tmp_path / "metadata.db")})()
+    try:
+        # A burst from the watchdog thread wakes the loop once
+        fire_from_thread(watcher, event, 100)
+        await asyncio.wait_for(started.wait(), timeout=1.0)
+        assert calls == 1
+        
+        # A change made while the callback runs is picked up by one follow-up run
+        started.clear()
+        fire_from_thread(watcher, event, 1)
+        release.set()
+        await asyncio.wait_for(started.wait(), timeout=1.0)
+        await asyncio.sleep(0.1)
+        assert calls == 2
+    finally:
+        watcher.cleanup()
+
+@pytest.mark.asyncio
+async def test_library_watcher_min_interval(tmp_path):
+    runs = []
+    
+    async def callback():
+        runs.append(time.monotonic())
+        await asyncio.sleep(0.1)
+        runs.append(time.monotonic())
+    
+    watcher = LibraryWatcher(callback, debounce_seconds=0.1)
+    await watcher.bind()
+    event = type("Event", (), {"src_path": str(tmp_path / "metadata.db")})()
+    try:
+        watcher.on_modified(event)
+        await asyncio.sleep(0.15)  # First run is in progress
+        watcher.on_modified(event)
+        await asyncio.sleep(0.4)
+        
+        assert len(runs) == 4
+        # The follow-up run waits a full window after the previous one finished
+        assert runs[2] - runs[1] >= 0.1
+    finally:
+        watcher.cleanup()
+
+@pytest.mark.asyncio
+async def test_reader_pool(mock_calibre_db):
+    connector = CalibreConnector(mock_calibre_db)
+    
+    results = await asyncio.gather(*(connector.get_book_files(1) for _ in range(READER_COUNT * 3)))
+    assert all(files == results[0] for files in results)
+    assert 0 < connector._reader_count <= READER_COUNT
+    
+    async with connector._acquire_reader() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO tags (name) VALUES ('nope')")
+    
+    await connector.cleanup()
+    assert connector._reader_count == 0 and connector._readers.empty()
+
+@pytest.mark.asyncio
+async def test_add_books(tmp_path):
+    connector = CalibreConnector(tmp_path)
+    await connector.initialize()
+    
+    result = await connector.add_books([
+        {"title": "One", "tags": ["a", "b"], "identifiers": {"isbn": "1"}, "series": "S"},
+        {"title": "Two", "tags": ["b"], "series": "S"},
+    ])
+    assert result["status"] == "success"
+    books = {book["title"]: book for book in await connector.get_books()}
+    assert [books["One"]["id"], books["Two"]["id"]] == result["book_ids"]
+    assert sorted(books["One"]["tags"]) == ["a", "b"]
+    assert books["Two"]["tags"] == ["b"]
+    
+    # A bad entry rolls back the whole batch
+    result = await connector.add_books([{"title": "Three"}, {"author": "No title"}])
+    assert result["status"] == "error"
+    assert len(await connector.get_books()) == 2
+    await connector.cleanup()
+
+@pytest.mark.asyncio
+async def test_read_cache_sizes_results_by_row_count(mock_calibre_db):
+    from bookbot.utils.calibre_connector import _READ_CACHE, RESULT_ROW_BYTES
+    connector = CalibreConnector(mock_calibre_db)
+    try:
+        await connector.get_book_tags(1)  # Opens the connection, switching the file to WAL
+        await _READ_CACHE.clear()
+        books = await connector.get_books()
+        
+        # Sizing does not walk the parsed rows
+        assert [size for _, _, size in _READ_CACHE.cache.values()] == [RESULT_ROW_BYTES * len(books)]
+    finally:
+        await connector.cleanup()
+
+@pytest.mark.asyncio
+async def test_books_query_uses_indexes(tmp_path):
+    connector = CalibreConnector(tmp_path)
+    await connector.initialize()
+    
+    async with connector._acquire_reader() as conn:
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + _SELECT_BOOKS))
+    for table in ("data", "identifiers", "comments", "books_tags_link"):
+        assert f"SEARCH {table} USING" in plan
+    await connector.cleanup()
+
+@pytest.mark.asyncio
+async def test_library_change_skipped_when_unchanged(mock_calibre_db):
+    connector = CalibreConnector(mock_calibre_db)
+    await connector.get_book_tags(1)  # Opens the connection, switching the file to WAL
+    await connector._on_library_change()
+    assert list(connector._books) == [1]
+    
+    calls = 0
+    get_change_mark = connector.get_change_mark
+    async def counting_get_change_mark():
+        nonlocal calls
+        calls += 1
+        return await get_change_mark()
+    connector.get_change_mark = counting_get_change_mark
+    
+    try:
+        # A repeated notification with no write does no queries
+        await connector._on_library_change()
+        assert calls == 0
+        
+        await connector.tag_book(1, "changed")
+        await connector._on_library_change()
+        assert calls == 1
+    finally:
+        await connector.cleanup()
+
+@pytest.mark.asyncio
+async def test_library_watcher_ignores_other_files(tmp_path):
+    from watchdog.events import FileModifiedEvent, DirModifiedEvent
+    calls = 0
+    
+    async def callback():
+        nonlocal calls
+        calls += 1
+    
+    watcher = LibraryWatcher(callback, debounce_seconds=0.05)
+    await watcher.bind()
+    try:
+        for event in (
+            FileModifiedEvent(str(tmp_path / "Author" / "Book (1)" / "cover.jpg")),
+            FileModifiedEvent(str(tmp_path / "old-metadata.db")),
+            FileModifiedEvent(str(tmp_path / "metadata.db-shm")),
+            DirModifiedEvent(str(tmp_path)),
+        ):
+            watcher.dispatch(event)
+        await asyncio.sleep(0.15)
+        assert calls == 0
+        
+        watcher.dispatch(FileModifiedEvent(str(tmp_path / "metadata.db-wal")))
+        await asyncio.sleep(0.15)
+        assert calls == 1
+    finally:
+        watcher.cleanup()
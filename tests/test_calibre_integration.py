@@ -1,5 +1,4 @@
 import pytest
-import json
 from pathlib import Path
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
@@ -90,7 +89,7 @@ async def test_calibre_sync_success(venice_config, mock_calibre_db, async_sessio
     assert book1 is not None
     assert book1["title"] == "Test Book 1"
     assert book1["author"] == "Test Author 1"
-    metadata1 = json.loads(book1["metadata"])
+    metadata1 = book1["metadata"]
     assert metadata1["calibre_id"] is not None
     assert metadata1["format"] == "EPUB"
     assert metadata1["tags"] == ["test", "fiction"]
@@ -100,7 +99,7 @@ async def test_calibre_sync_success(venice_config, mock_calibre_db, async_sessio
     assert book2 is not None
     assert book2["title"] == "Test Book 2"
     assert book2["author"] == "Test Author 2"
-    metadata2 = json.loads(book2["metadata"])
+    metadata2 = book2["metadata"]
     assert metadata2["calibre_id"] is not None
     assert metadata2["format"] == "PDF"
     assert metadata2["tags"] == ["test", "non-fiction"]
@@ -153,7 +152,7 @@ async def test_calibre_sync_update_existing(venice_config, mock_calibre_db, asyn
     
     # Verify update
     book1 = await agent.get_book(1)
-    metadata1 = json.loads(book1["metadata"])
+    metadata1 = book1["metadata"]
     assert "updated" in metadata1["tags"]
     assert metadata1["series"] == "Updated Series"
     
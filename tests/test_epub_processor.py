@@ -72,3 +72,47 @@ async def test_epub_processor_chunking(test_epub_path):
     for chunk in result["chunks"]:
         words = chunk.split()
         assert len(words) <= 5
+
+@pytest.mark.asyncio
+async def test_epub_processor_stream_file(test_epub_path):
+    processor = EPUBProcessor(max_chunk_size=5)
+    result = await processor.process_file(test_epub_path)
+    streamed = await processor.stream_file(test_epub_path)
+    
+    assert streamed["metadata"] == result["metadata"]
+    assert streamed["content_hash"] == result["content_hash"]
+    assert "content" not in streamed
+    assert not isinstance(streamed["chunks"], list)
+    assert list(streamed["chunks"]) == result["chunks"]
+
+@pytest.mark.asyncio
+async def test_epub_processor_runs_off_event_loop(test_epub_path):
+    import threading
+    processor = EPUBProcessor(max_workers=2)
+    threads = []
+    read_book = processor._read_book
+    
+    def tracking_read_book(file_path):
+        threads.append(threading.current_thread())
+        return read_book(file_path)
+    processor._read_book = tracking_read_book
+    
+    results = await asyncio.gather(*(processor.process_file(test_epub_path) for _ in range(4)))
+    assert all(result["content_hash"] == results[0]["content_hash"] for result in results)
+    assert threading.main_thread() not in threads
+
+@pytest.mark.asyncio
+async def test_epub_processor_stream_file_chunks_off_event_loop(test_epub_path):
+    import threading
+    processor = EPUBProcessor(max_chunk_size=5)
+    threads = []
+    iter_chunks = processor._iter_chunks
+    
+    def tracking_iter_chunks(content):
+        threads.append(threading.current_thread())
+        return iter_chunks(content)
+    processor._iter_chunks = tracking_iter_chunks
+    
+    streamed = await processor.stream_file(test_epub_path)
+    assert list(streamed["chunks"])
+    assert threads and threading.main_thread() not in threads
@@ -139,6 +139,7 @@ def test_epub_path(tmp_path):
 @pytest.mark.asyncio
 async def test_librarian_agent_process_epub(test_epub_path, async_session):
     from ebooklib import epub
+    from unittest.mock import AsyncMock
     config = VeniceConfig(api_key="test_key")
     agent = LibrarianAgent(venice_config=config, session=async_session, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
     await agent.initialize()
@@ -165,7 +166,112 @@ async def test_librarian_agent_process_epub(test_epub_path, async_session):
         assert book_result["book"]["author"] == "Test Author"
         assert "content_hash" in book_result["book"]
         assert "vector_id" in book_result["book"]
+        
+        # Re-ingesting the same file skips the vector store entirely
+        agent.vector_store.add_texts = AsyncMock()
+        cached = await agent.process({
+            "action": "process_epub",
+            "file_path": str(test_epub_path)
+        })
+        
+        assert cached["status"] == "success"
+        assert cached["cached"]
+        assert cached["book_id"] == result["book_id"]
+        assert cached["vector_ids"] == result["vector_ids"]
+        agent.vector_store.add_texts.assert_not_called()
+    finally:
+        await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_librarian_agent_process_epub_cached_returns_every_chunk(async_session, monkeypatch):
+    from bookbot.agents.librarian import agent as librarian_module
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, session=async_session, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    await agent.initialize()
+    monkeypatch.setattr(librarian_module, "EMBED_BATCH_SIZE", 2)
+    
+    async def stream_file(file_path):
+        return {
+            "metadata": {"title": "Long Book", "author": "Author"},
+            "chunks": iter([f"chunk {i}" for i in range(12)]),
+            "content_hash": "long-book"
+        }
+    agent.epub_processor.stream_file = stream_file
+    
+    try:
+        result = await agent.process({"action": "process_epub", "file_path": "long.epub"})
+        assert len(result["vector_ids"]) == 12
+        
+        cached = await agent.process({"action": "process_epub", "file_path": "long.epub"})
+        assert cached["cached"]
+        assert cached["vector_ids"] == result["vector_ids"]
+    finally:
+        await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_librarian_agent_process_epub_embedding_failure(test_epub_path, async_session):
+    from unittest.mock import AsyncMock
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, session=async_session, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    await agent.initialize()
+    agent.vector_store.add_texts = AsyncMock(side_effect=RuntimeError("Embedding service unavailable"))
+    
+    try:
+        result = await agent.process({
+            "action": "process_epub",
+            "file_path": str(test_epub_path)
+        })
+        
+        assert result["status"] == "error"
+        assert "Embedding service unavailable" in result["message"]
+        # The row inserted alongside the embedding pass is removed again
+        assert await agent.get_book(1) is None
+    finally:
+        await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_librarian_agent_process_epub_failure_leaves_no_trace(async_session, monkeypatch):
+    from unittest.mock import AsyncMock
+    from bookbot.agents.librarian import agent as librarian_module
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, session=async_session, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    await agent.initialize()
+    agent.calibre = AsyncMock()
+    monkeypatch.setattr(librarian_module, "EMBED_BATCH_SIZE", 2)
+    
+    async def stream_file(file_path):
+        return {
+            "metadata": {"title": "Long Book", "author": "Author"},
+            "chunks": iter([f"chunk {i}" for i in range(6)]),
+            "content_hash": "long-book"
+        }
+    agent.epub_processor.stream_file = stream_file
+    
+    # Every batch after the first fails to embed
+    add_texts = agent.vector_store.add_texts
+    async def flaky_add_texts(texts, metadata, ids):
+        if texts[0] != "chunk 0":
+            raise RuntimeError("Embedding service unavailable")
+        return await add_texts(texts=texts, metadata=metadata, ids=ids)
+    agent.vector_store.add_texts = flaky_add_texts
+    
+    try:
+        result = await agent.process({"action": "process_epub", "file_path": "long.epub"})
+        
+        assert result["status"] == "error"
+        assert await agent.get_book(1) is None
+        assert await agent.vector_store.get_ids(metadata_filter={"content_hash": "long-book"}) == []
+        agent.calibre.add_book.assert_not_called()
+        
+        # Once embedding works the book reaches Calibre exactly once
+        agent.vector_store.add_texts = add_texts
+        result = await agent.process({"action": "process_epub", "file_path": "long.epub"})
+        
+        assert result["status"] == "success"
+        assert len(result["vector_ids"]) == 6
+        agent.calibre.add_book.assert_awaited_once()
     finally:
+        agent.calibre = None
         await agent.cleanup()
 
 @pytest.mark.asyncio
@@ -188,3 +294,300 @@ async def test_librarian_agent_process_epub_invalid_file(async_session, tmp_path
         assert "message" in result
     finally:
         await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_librarian_agent_sync_calibre_batches():
+    from unittest.mock import AsyncMock
+    from bookbot.agents.librarian import agent as librarian_module
+    
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    await agent.initialize()
+    
+    calibre_books = [
+        {
+            "id": i,
+            "title": f"Calibre Book {i}",
+            "author": f"Author {i}",
+            "format": "EPUB",
+            "identifiers": {},
+            "tags": ["test"]
+        }
+        for i in range(5)
+    ]
+    agent.calibre = AsyncMock()
+    agent.calibre.get_books.return_value = calibre_books
+    
+    try:
+        original_batch_size = librarian_module.SYNC_BATCH_SIZE
+        librarian_module.SYNC_BATCH_SIZE = 2
+        try:
+            result = await agent.process({"action": "sync_calibre"})
+            assert result["status"] == "success"
+            assert result["books_synced"] == 5
+            
+            # Second sync updates the existing rows instead of duplicating them
+            calibre_books[0]["tags"] = ["test", "updated"]
+            result = await agent.process({"action": "sync_calibre"})
+            assert result["status"] == "success"
+            assert result["books_synced"] == 5
+        finally:
+            librarian_module.SYNC_BATCH_SIZE = original_batch_size
+        
+        for book_id in range(1, 6):
+            assert await agent.get_book(book_id) is not None
+        assert await agent.get_book(6) is None
+        
+        book = await agent.get_book(1)
+        assert book["metadata"]["tags"] == ["test", "updated"]
+    finally:
+        agent.calibre = None
+        await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_librarian_agent_process_epubs(tmp_path, async_session):
+    paths = []
+    for i in range(2):
+        book = epub.EpubBook()
+        book.set_identifier(f'batch{i}')
+        book.set_title(f'Batch Book {i}')
+        book.set_language('en')
+        book.add_author('Batch Author')
+        
+        chapter = epub.EpubHtml(title='Chapter 1', file_name='chap_01.xhtml', lang='en')
+        chapter.content = f'<h1>Chapter 1</h1><p>Batch content number {i}.</p>'
+        chapter.id = 'chapter1'
+        book.add_item(chapter)
+        book.add_item(epub.EpubNav())
+        book.add_item(epub.EpubNcx())
+        book.spine = ['nav', chapter.id]
+        book.toc = [(epub.Section(f'Batch Book {i}'), [chapter])]
+        
+        epub_path = tmp_path / f"batch{i}.epub"
+        epub.write_epub(str(epub_path), book)
+        paths.append(str(epub_path))
+    
+    invalid_path = tmp_path / "invalid.epub"
+    invalid_path.write_text("Not an EPUB file")
+    
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, session=async_session, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    await agent.initialize()
+    
+    try:
+        result = await agent.process({
+            "action": "process_epubs",
+            "file_paths": paths + [str(invalid_path)]
+        })
+        
+        assert result["status"] == "success"
+        assert len(result["books"]) == 2
+        assert len(result["errors"]) == 1
+        assert result["errors"][0]["file_path"] == str(invalid_path)
+        
+        for i, entry in enumerate(result["books"]):
+            assert entry["file_path"] == paths[i]
+            assert len(entry["vector_ids"]) > 0
+            book = await agent.get_book(entry["book_id"])
+            assert book["title"] == f"Batch Book {i}"
+            assert book["vector_id"] == entry["vector_ids"][0]
+    finally:
+        await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_librarian_agent_add_book_calibre_failure(async_session):
+    from unittest.mock import AsyncMock
+    
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, session=async_session, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    await agent.initialize()
+    agent.calibre = AsyncMock()
+    agent.calibre.add_book.side_effect = RuntimeError("Calibre unavailable")
+    
+    try:
+        result = await agent.add_book({"title": "Test Book", "author": "Test Author"})
+        assert result["status"] == "success"
+        assert agent.calibre.add_book.await_count == 1
+        
+        book = await agent.get_book(result["book_id"])
+        assert book["title"] == "Test Book"
+    finally:
+        agent.calibre = None
+        await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_librarian_agent_add_summaries(async_session):
+    from sqlalchemy import select
+    from bookbot.database.models import Summary, SummaryLevel, SummaryType
+    
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, session=async_session, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    await agent.initialize()
+    
+    try:
+        book_result = await agent.add_book({"title": "Test Book"})
+        summaries = [
+            {
+                "book_id": book_result["book_id"],
+                "level": level,
+                "content": f"Summary {level}",
+                "vector_id": f"vec{level}",
+                "summary_type": SummaryType.BOOK
+            }
+            for level in (0, 1, 2)
+        ]
+        
+        result = await agent.process({
+            "action": "add_summaries",
+            "summaries": summaries
+        })
+        assert result["status"] == "success"
+        assert len(result["summary_ids"]) == 3
+        
+        rows = (await async_session.execute(
+            select(Summary).where(Summary.id.in_(result["summary_ids"])).order_by(Summary.id)
+        )).scalars().all()
+        assert [row.level for row in rows] == [SummaryLevel.DETAILED, SummaryLevel.CONCISE, SummaryLevel.BRIEF]
+        assert [row.content for row in rows] == ["Summary 0", "Summary 1", "Summary 2"]
+        
+        # A bad row rolls back the whole batch
+        result = await agent.add_summaries(summaries + [{"book_id": book_result["book_id"]}])
+        assert result["status"] == "error"
+        remaining = (await async_session.execute(select(Summary))).scalars().all()
+        assert len(remaining) == 3
+    finally:
+        await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_librarian_agent_sync_calibre_injected_session(async_session):
+    from unittest.mock import AsyncMock
+    
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, session=async_session, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    await agent.initialize()
+    
+    agent.calibre = AsyncMock()
+    agent.calibre.get_books.return_value = [
+        {"id": 1, "title": "Calibre Book", "author": "Author", "format": "EPUB", "identifiers": {}, "tags": []}
+    ]
+    
+    result = await agent.process({"action": "sync_calibre"})
+    assert result["status"] == "success"
+    assert result["books_synced"] == 1
+    
+    book = await agent.get_book(1)
+    assert book["title"] == "Calibre Book"
+    assert book["metadata"]["calibre_id"] == 1
+    
+    await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_librarian_agent_embed_chunks_pipelined(monkeypatch):
+    from bookbot.agents.librarian import agent as librarian_module
+    
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    monkeypatch.setattr(librarian_module, "EMBED_BATCH_SIZE", 2)
+    
+    in_flight = 0
+    max_in_flight = 0
+    async def add_texts(texts, metadata, ids):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [f"id-{text}" for text in texts]
+    agent.vector_store.add_texts = add_texts
+    
+    chunk_ids = await agent._embed_chunks((str(i) for i in range(7)), {"content_hash": "abc"})
+    
+    assert chunk_ids == [f"id-{i}" for i in range(7)]
+    assert max_in_flight == 2
+
+@pytest.mark.asyncio
+async def test_librarian_agent_embed_chunks_failure_cancels_next_batch(monkeypatch):
+    from bookbot.agents.librarian import agent as librarian_module
+    
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    monkeypatch.setattr(librarian_module, "EMBED_BATCH_SIZE", 2)
+    
+    started = []
+    finished = []
+    async def add_texts(texts, metadata, ids):
+        started.append(texts[0])
+        if texts[0] == "0":
+            raise RuntimeError("embed failed")
+        await asyncio.sleep(0.05)
+        finished.append(texts[0])
+        return list(texts)
+    agent.vector_store.add_texts = add_texts
+    
+    with pytest.raises(RuntimeError):
+        await agent._embed_chunks((str(i) for i in range(4)), {"content_hash": "abc"})
+    await asyncio.sleep(0.1)
+    
+    # The batch started alongside the failing one was cancelled, not left running
+    assert started == ["0", "2"]
+    assert finished == []
+
+@pytest.mark.asyncio
+async def test_librarian_agent_embed_chunks_retrieves_sibling_failure(monkeypatch):
+    import gc
+    from bookbot.agents.librarian import agent as librarian_module
+    
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    monkeypatch.setattr(librarian_module, "EMBED_BATCH_SIZE", 2)
+    
+    # The batch started second fails before the one being awaited does
+    async def add_texts(texts, metadata, ids):
+        if texts[0] == "0":
+            await asyncio.sleep(0.05)
+        raise RuntimeError(f"embed failed at {texts[0]}")
+    agent.vector_store.add_texts = add_texts
+    
+    unhandled = []
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+    failed = False
+    try:
+        await agent._embed_chunks((str(i) for i in range(4)), {"content_hash": "abc"})
+    except RuntimeError:
+        failed = True
+    # Freeing the tasks reports any exception that was never retrieved
+    await asyncio.sleep(0.1)
+    gc.collect()
+    
+    assert failed
+    assert unhandled == []
+
+@pytest.mark.asyncio
+async def test_librarian_agent_process_epubs_skips_known_books(test_epub_path, async_session):
+    config = VeniceConfig(api_key="test_key")
+    agent = LibrarianAgent(venice_config=config, session=async_session, db_url="sqlite+aiosqlite:///:memory:", calibre_path=None, vram_limit=16.0)
+    await agent.initialize()
+    
+    try:
+        first = await agent.process({"action": "process_epub", "file_path": test_epub_path})
+        assert first["status"] == "success"
+        
+        embedded = []
+        add_texts = agent.vector_store.add_texts
+        async def counting_add_texts(texts, metadata, ids):
+            embedded.extend(texts)
+            return await add_texts(texts=texts, metadata=metadata, ids=ids)
+        agent.vector_store.add_texts = counting_add_texts
+        
+        # The already-ingested file, listed twice, neither re-embeds nor hits the unique constraint
+        result = await agent.process({
+            "action": "process_epubs",
+            "file_paths": [test_epub_path, test_epub_path]
+        })
+        assert result["status"] == "success"
+        assert embedded == []
+        assert [entry["book_id"] for entry in result["books"]] == [first["book_id"]] * 2
+        assert all(entry["cached"] for entry in result["books"])
+        assert all(entry["vector_ids"] == first["vector_ids"] for entry in result["books"])
+    finally:
+        await agent.cleanup()
@@ -158,3 +158,92 @@ async def test_query_error_handling(async_session):
         assert "message" in result
     finally:
         await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_find_relevant_content_batches_book_lookup(async_session):
+    config = VeniceConfig(api_key="test_key")
+    agent = QueryAgent(config, async_session)
+    try:
+        await agent.initialize()
+        
+        books = [
+            Book(title=f"Book {i}", author=f"Author {i}", content_hash=f"batch{i}", vector_id=f"vec{i}")
+            for i in range(2)
+        ]
+        async_session.add_all(books)
+        await async_session.commit()
+        
+        agent.vector_store.similarity_search = AsyncMock(return_value=[
+            {"content": "second", "metadata": {"book_id": str(books[1].id)}, "distance": 0.1},
+            {"content": "missing", "metadata": {"book_id": "999"}, "distance": 0.2},
+            {"content": "first", "metadata": {"book_id": str(books[0].id)}, "distance": 0.3},
+            {"content": "second again", "metadata": {"book_id": str(books[1].id)}, "distance": 0.4},
+            {"content": "no book", "metadata": {}, "distance": 0.5}
+        ])
+        
+        with patch.object(async_session, "execute", wraps=async_session.execute) as execute:
+            content = await agent.find_relevant_content("query", k=5)
+        
+        assert execute.await_count == 1
+        assert [c["content"] for c in content] == ["second", "first", "second again"]
+        assert [c["book"]["title"] for c in content] == ["Book 1", "Book 0", "Book 1"]
+        
+        # Books seen before are served from the LRU cache
+        with patch.object(async_session, "execute", wraps=async_session.execute) as execute:
+            cached_content = await agent.find_relevant_content("query", k=5)
+        
+        assert execute.await_count == 1  # only the unknown id 999 is looked up again
+        assert cached_content == content
+        
+        agent.vector_store.similarity_search.return_value = [
+            {"content": "first", "metadata": {"book_id": str(books[0].id)}, "distance": 0.3}
+        ]
+        with patch.object(async_session, "execute", wraps=async_session.execute) as execute:
+            await agent.find_relevant_content("query")
+        
+        assert execute.await_count == 0
+    finally:
+        await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_generate_respects_max_concurrency(async_session):
+    config = VeniceConfig(api_key="test_key", max_concurrency=2)
+    agent = QueryAgent(config, async_session)
+    try:
+        await agent.initialize()
+        
+        in_flight = 0
+        max_in_flight = 0
+        async def generate(prompt, **kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"choices": [{"text": json.dumps({"answer": "ok", "citations": [], "confidence": 0.5})}]}
+        agent.venice.generate = generate
+        
+        results = await asyncio.gather(*(agent.generate_response(f"q{i}", []) for i in range(6)))
+        
+        assert all(result["answer"] == "ok" for result in results)
+        assert max_in_flight == 2
+    finally:
+        await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_similarity_search_cache(async_session):
+    config = VeniceConfig(api_key="test_key")
+    agent = QueryAgent(config, async_session)
+    try:
+        await agent.initialize()
+        agent.vector_store.similarity_search = AsyncMock(return_value=[])
+        
+        await agent.find_relevant_content("What is this book about?")
+        await agent.find_relevant_content("  what is   THIS book about? ")
+        assert agent.vector_store.similarity_search.await_count == 1
+        
+        # A different k is a different search
+        await agent.find_relevant_content("What is this book about?", k=5)
+        assert agent.vector_store.similarity_search.await_count == 2
+    finally:
+        await agent.cleanup()
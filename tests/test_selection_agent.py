@@ -1,7 +1,7 @@
 import pytest
 import asyncio
 from unittest.mock import patch, MagicMock
-from bookbot.agents.selection.agent import SelectionAgent
+from bookbot.agents.selection.agent import SelectionAgent, EVALUATION_LATENCY_SECONDS
 from bookbot.utils.venice_client import VeniceConfig
 from bookbot.utils.vector_store import VectorStore
 
@@ -66,6 +66,31 @@ async def test_selection_agent_process_success(async_session):
     assert "total_score" in book
     assert 0 <= book["total_score"] <= 100
 
+@pytest.mark.asyncio
+async def test_selection_agent_fenced_json(async_session):
+    config = VeniceConfig(api_key="test_key")
+    agent = SelectionAgent(config, session=async_session)
+    await agent.initialize()
+    
+    async def mock_generate(*args, **kwargs):
+        return {"choices": [{"text": '```json\n{"total_score": 90, "key_topics": ["ml"]}\n```'}]}
+    agent.venice.generate = mock_generate
+    
+    result = await agent.process({"books": [{"title": "Fenced", "author": "A", "description": "ML"}]})
+    assert result["status"] == "success"
+    assert not result["errors"]
+    assert result["selected_books"][0]["total_score"] == 90
+    
+    # Python literals are no longer accepted
+    async def literal_generate(*args, **kwargs):
+        return {"choices": [{"text": "{'total_score': 90}"}]}
+    agent.venice.generate = literal_generate
+    agent.cache = type(agent.cache)(ttl=3600, max_size=100)
+    
+    result = await agent.process({"books": [{"title": "Literal", "author": "B", "description": "ML"}]})
+    assert not result["selected_books"]
+    assert "Evaluation parsing error" in result["errors"][0]["error"]
+
 @pytest.mark.asyncio
 async def test_selection_agent_metadata_extraction(async_session):
     config = VeniceConfig(api_key="test_key")
@@ -155,15 +180,82 @@ async def test_selection_agent_vector_storage(async_session):
     assert len(vectors) > 0
     assert vectors[0]["metadata"]["title"] == "Deep Learning"
 
+@pytest.mark.asyncio
+async def test_selection_agent_partial_vector_storage(async_session):
+    config = VeniceConfig(api_key="test_key")
+    agent = SelectionAgent(config, session=async_session)
+    await agent.initialize()
+    
+    async def mock_generate(*args, **kwargs):
+        return {"choices": [{"text": '{"total_score": 85, "key_topics": ["ai"], "recommended_reading_order": 2}'}]}
+    agent.venice.generate = mock_generate
+    
+    # Storage fails for any batch containing the bad book, so only that book is dropped
+    stored = []
+    async def add_texts(texts, metadata, ids):
+        if any(entry["title"] == "Bad Book" for entry in metadata):
+            raise RuntimeError("storage failed")
+        stored.extend(entry["title"] for entry in metadata)
+        return ids
+    agent.vector_store.add_texts = add_texts
+    
+    result = await agent.process({"books": [
+        {"title": "Good Book", "description": "first"},
+        {"title": "Bad Book", "description": "second"},
+    ]})
+    
+    assert [book["title"] for book in result["selected_books"]] == ["Good Book"]
+    assert stored == ["Good Book"]
+    assert result["errors"] == [{"book": "Bad Book", "error": "Vector storage error: storage failed"}]
+
+@pytest.mark.asyncio
+async def test_selection_agent_vector_storage_retry_skips_stored_slices(async_session):
+    config = VeniceConfig(api_key="test_key")
+    agent = SelectionAgent(config, session=async_session)
+    await agent.initialize()
+    agent.vector_store.max_batch_size = 1
+    
+    async def mock_generate(*args, **kwargs):
+        return {"choices": [{"text": '{"total_score": 85, "key_topics": ["ai"], "recommended_reading_order": 2}'}]}
+    agent.venice.generate = mock_generate
+    
+    # The first slice of the batched call is stored before the second one fails
+    collection_add = agent.vector_store.collection.add
+    calls = 0
+    def flaky_add(**kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("storage failed")
+        return collection_add(**kwargs)
+    agent.vector_store.collection.add = flaky_add
+    
+    result = await agent.process({"books": [
+        {"title": "First Book", "description": "first"},
+        {"title": "Second Book", "description": "second"},
+    ]})
+    
+    assert sorted(book["title"] for book in result["selected_books"]) == ["First Book", "Second Book"]
+    assert result["errors"] is None
+    # Only the slice that failed is sent again
+    assert calls == 3
+    assert len(agent.vector_store.collection.ids) == 2
+
 @pytest.mark.asyncio
 async def test_selection_agent_rate_limiting(async_session):
     config = VeniceConfig(api_key="test_key")
     agent = SelectionAgent(config, session=async_session)
     await agent.initialize()
     
+    in_flight = 0
+    max_in_flight = 0
     # Mock the Venice client response
     async def mock_generate(*args, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
         await asyncio.sleep(0.2)  # Add delay to simulate API call
+        in_flight -= 1
         return {
             "choices": [{
                 "text": '{"relevance_score": 35, "technical_score": 25, "recency_score": 12, "expertise_score": 13, "total_score": 85, "reasoning": "Highly relevant AI/ML text", "key_topics": ["deep learning", "neural networks"], "target_audience": "researchers", "prerequisites": ["calculus", "linear algebra"], "recommended_reading_order": 4}'
@@ -171,23 +263,28 @@ async def test_selection_agent_rate_limiting(async_session):
         }
     agent.venice.generate = mock_generate
     
-    # Create multiple books to trigger rate limiting
+    # Create more books than may be evaluated at once
     test_books = [
         {
             "title": f"Book {i}",
             "author": f"Author {i}",
             "description": f"Description {i}"
         }
-        for i in range(10)
+        for i in range(25)
     ]
+    limits = agent.rate_limiter.config
+    limit = limits.requests_per_window * EVALUATION_LATENCY_SECONDS // limits.window_seconds
     
     start_time = asyncio.get_event_loop().time()
     result = await agent.process({"books": test_books})
     end_time = asyncio.get_event_loop().time()
     
     assert result["status"] == "success"
-    # Verify rate limiting added some delay
-    assert end_time - start_time >= 1.0  # At least 1 second delay
+    assert len(result["selected_books"]) == 25
+    # Evaluations overlap, but never more than the limit at once
+    assert max_in_flight == limit
+    assert end_time - start_time >= 0.6  # 25 books in rounds of 10
+    assert end_time - start_time < 25 * 0.2
 
 @pytest.mark.asyncio
 async def test_selection_agent_error_handling(async_session):
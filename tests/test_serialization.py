@@ -0,0 +1,25 @@
+import json
+import pytest
+from bookbot.utils import serialization
+
+def test_serialization_round_trip():
+    data = {"title": "Test Book", "tags": ["a", "b"], "rating": 4.5, "nested": {"id": 1}}
+    encoded = serialization.dumps(data)
+    
+    assert isinstance(encoded, str)
+    assert json.loads(encoded) == data
+    assert serialization.loads(encoded) == data
+
+def test_serialization_stdlib_fallback(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    data = {"title": "Test Book", "authors": ["Test Author"]}
+    
+    assert serialization.loads(serialization.dumps(data)) == data
+
+def test_serialization_sort_keys():
+    data = {"b": 1, "a": {"d": 2, "c": 3}}
+    
+    encoded = serialization.dumps(data, sort_keys=True)
+    
+    assert list(json.loads(encoded)) == ["a", "b"]
+    assert list(json.loads(encoded)["a"]) == ["c", "d"]
@@ -1,9 +1,10 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from bookbot.agents.summarization.agent import SummarizationAgent
+import asyncio
+from bookbot.agents.summarization.agent import SummarizationAgent, SUMMARY_TASK_CONCURRENCY
 from bookbot.utils.venice_client import VeniceConfig
 from bookbot.database.models import Book, Summary, SummaryType, SummaryLevel
-from sqlalchemy import select
+from sqlalchemy import select, text
 
 pytestmark = pytest.mark.asyncio
 
@@ -33,7 +34,7 @@ Book content here
 Volume 2
 Volume content here
 """
-    chapters = agent._split_into_chapters(test_content)
+    chapters = list(agent._split_into_chapters(test_content))
     assert len(chapters) == 6
     assert "Chapter 1" in chapters[0]
     assert "Chapter 2" in chapters[1]
@@ -71,6 +72,14 @@ async def test_summary_caching():
         result2 = await agent.process_book_content(test_content, test_metadata)
         assert not mock_generate.called
         assert result2 == result1
+        
+        # A stored content hash is used as the key without rehashing the text
+        result3 = await agent.process_book_content("Other text", {**test_metadata, "content_hash": "abc123"})
+        assert mock_generate.called
+        mock_generate.reset_mock()
+        result4 = await agent.process_book_content("Other text, edited", {**test_metadata, "content_hash": "abc123"})
+        assert not mock_generate.called
+        assert result4 == result3
 
 @pytest.mark.asyncio
 async def test_rate_limiting():
@@ -97,6 +106,26 @@ async def test_rate_limiting():
         assert mock_generate.called
         assert mock_embed.called
 
+@pytest.mark.asyncio
+async def test_embedding_cache():
+    config = VeniceConfig(api_key="test_key")
+    agent = SummarizationAgent(config, AsyncMock())
+    await agent.initialize()
+    
+    with patch.object(agent.venice, 'generate', new_callable=AsyncMock) as mock_generate, \
+         patch.object(agent.venice, 'embed', new_callable=AsyncMock) as mock_embed:
+        mock_generate.return_value = {"choices": [{"text": "Same summary"}]}
+        mock_embed.return_value = {"data": [{"embedding": [0.1, 0.2, 0.3]}]}
+        
+        summaries = await agent.generate_hierarchical_summary("First text")
+        assert len(summaries) == 3
+        assert all(summary["vector"] == [0.1, 0.2, 0.3] for summary in summaries)
+        # Identical level texts are embedded once
+        mock_embed.assert_called_once_with(["Same summary"])
+        
+        await agent.generate_hierarchical_summary("Second text")
+        assert mock_embed.call_count == 1
+
 @pytest.mark.asyncio
 async def test_database_integration(async_session):
     config = VeniceConfig(api_key="test_key")
@@ -151,6 +180,55 @@ async def test_database_integration(async_session):
         assert len(db_summaries) > 0
         assert db_summaries[0].level == SummaryLevel.DETAILED
         assert db_summaries[0].summary_type == SummaryType.CHAPTER
+        
+        # Levels are stored as small integers
+        raw_levels = (await async_session.execute(text("SELECT level FROM summaries"))).scalars().all()
+        assert raw_levels == [SummaryLevel.DETAILED.value] * len(db_summaries)
+
+@pytest.mark.asyncio
+async def test_repeated_chapters_summarized_once():
+    config = VeniceConfig(api_key="test_key")
+    agent = SummarizationAgent(config, AsyncMock())
+    await agent.initialize()
+    
+    test_content = "Part 1\nAuthor's note\n\nChapter 1\nBody text\n\nPart 1\nAuthor's note"
+    
+    async def fake_summary(content, depth=3, context=""):
+        return [{"level": SummaryLevel.DETAILED, "content": f"Summary of {content[:10]}", "vector": [0.1], "vector_id": "v"}]
+    
+    with patch.object(agent, 'generate_hierarchical_summary', side_effect=fake_summary) as mock_generate:
+        summaries = await agent.process_book_content(test_content, {"title": "Test Book"})
+    
+    chapter_calls = [call for call in mock_generate.call_args_list if call.kwargs["context"].startswith("Chapter")]
+    assert len(chapter_calls) == 2
+    chapter_summaries = [s for s in summaries if s["summary_type"] == SummaryType.CHAPTER][1:]
+    assert [s["chapter_index"] for s in chapter_summaries] == [0, 1, 2]
+    assert chapter_summaries[0]["content"] == chapter_summaries[2]["content"]
+
+@pytest.mark.asyncio
+async def test_summary_tasks_bounded():
+    config = VeniceConfig(api_key="test_key")
+    agent = SummarizationAgent(config, AsyncMock())
+    await agent.initialize()
+    
+    test_content = "\n\n".join(f"Chapter {i}\nText of chapter {i}" for i in range(1, 41))
+    in_flight = 0
+    max_in_flight = 0
+    
+    async def fake_summary(content, depth=3, context=""):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [{"level": SummaryLevel.DETAILED, "content": "Summary", "vector": [0.1], "vector_id": "v"}]
+    
+    with patch.object(agent, 'generate_hierarchical_summary', side_effect=fake_summary) as mock_generate:
+        summaries = await agent.process_book_content(test_content, {"title": "Long Book"})
+    
+    assert mock_generate.call_count == 42  # Detailed, 40 chapters and the book summary
+    assert len(summaries) == 42
+    assert max_in_flight == SUMMARY_TASK_CONCURRENCY
 
 @pytest.mark.asyncio
 async def test_error_handling():
@@ -168,3 +246,25 @@ async def test_error_handling():
         result = await agent.process({"content": "test", "metadata": {}})
         assert result["status"] == "error"
         assert "Test error" in result["message"]
+
+def test_summary_level_reads_legacy_values():
+    level_type = Summary.__table__.c.level.type
+    # Enum names from before the SMALLINT column, and digits SQLite returns from a legacy VARCHAR column
+    assert level_type.process_result_value("CONCISE", None) == SummaryLevel.CONCISE
+    assert level_type.process_result_value("2", None) == SummaryLevel.BRIEF
+    assert level_type.process_result_value(0, None) == SummaryLevel.DETAILED
+
+@pytest.mark.asyncio
+async def test_embed_texts_checks_response():
+    config = VeniceConfig(api_key="test_key")
+    agent = SummarizationAgent(config, AsyncMock())
+    
+    with patch.object(agent.venice, 'embed', new_callable=AsyncMock) as mock_embed:
+        # Out-of-order items are matched back to their inputs by index
+        mock_embed.return_value = {"data": [{"index": 1, "embedding": [2.0]}, {"index": 0, "embedding": [1.0]}]}
+        assert await agent._embed_texts(["a", "b"]) == [[1.0], [2.0]]
+        
+        # A short response is an error, not a partial result
+        mock_embed.return_value = {"data": [{"embedding": [3.0]}]}
+        with pytest.raises(RuntimeError):
+            await agent._embed_texts(["c", "d"])
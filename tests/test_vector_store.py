@@ -95,3 +95,14 @@ async def test_empty_operations(test_persist_dir):
         assert len(results) == 0
     finally:
         await store.cleanup()
+
+@pytest.mark.asyncio
+async def test_get_ids(test_persist_dir):
+    store = VectorStore("test_collection", persist_dir=test_persist_dir)
+    try:
+        await store.add_texts(["doc1", "doc2"], [{"source": "a"}, {"source": "b"}], ["1", "2"])
+        
+        assert await store.get_ids(ids=["1", "3"]) == ["1"]
+        assert await store.get_ids(metadata_filter={"source": "b"}) == ["2"]
+    finally:
+        await store.cleanup()
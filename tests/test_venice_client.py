@@ -151,3 +151,113 @@ async def test_venice_client_embed():
         assert all(isinstance(x, float) for x in result["data"][0]["embedding"])
     finally:
         await client.cleanup()
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(60)
+async def test_venice_client_json_response_format():
+    config = VeniceConfig(api_key="test_key")
+    client = VeniceClient(config)
+    try:
+        parsed = await client.generate("Test prompt", response_format="json")
+        assert isinstance(parsed["choices"][0]["text"], dict)
+        assert "answer" in parsed["choices"][0]["text"]
+        
+        raw = await client.generate("Test prompt")
+        assert json.loads(raw["choices"][0]["text"]) == parsed["choices"][0]["text"]
+    finally:
+        await client.cleanup()
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(60)
+async def test_venice_client_embed_list():
+    config = VeniceConfig(api_key="test_key")
+    client = VeniceClient(config)
+    try:
+        result = await client.embed(["first text", "second text", "third text"])
+        assert len(result["data"]) == 3
+        assert all("embedding" in item for item in result["data"])
+    finally:
+        await client.cleanup()
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(60)
+async def test_venice_client_generate_batch():
+    config = VeniceConfig(api_key="test_key")
+    client = VeniceClient(config)
+    try:
+        prompts = ["Evaluate this book", "Test prompt", "Evaluate another book"]
+        results = await client.generate_batch(prompts, temperature=0.3)
+        assert len(results) == 3
+        for prompt, result in zip(prompts, results):
+            assert result == await client.generate(prompt, temperature=0.3)
+    finally:
+        await client.cleanup()
+
+class FakeResponse:
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self._body = body
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    async def json(self):
+        return self._body
+    
+    async def text(self):
+        return json.dumps(self._body)
+
+class FakeSession:
+    closed = False
+    
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.payloads = []
+    
+    def post(self, url, headers=None, json=None):
+        self.payloads.append(json)
+        return self.responses.pop(0)
+    
+    async def close(self):
+        self.closed = True
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(60)
+async def test_venice_client_generate_rate_limit_retry_keeps_arguments():
+    client = VeniceClient(VeniceConfig(api_key="real_key"))
+    client._session = FakeSession([
+        FakeResponse(429, headers={"Retry-After": "0"}),
+        FakeResponse(200, {"choices": [{"text": '{"answer": "ok"}'}]}),
+    ])
+    try:
+        result = await client.generate("Prompt", max_tokens=12, response_format="json")
+        assert result["choices"][0]["text"] == {"answer": "ok"}
+        retried = client._session.payloads[1]
+        assert retried["max_tokens"] == 12
+        assert retried["response_format"] == {"type": "json_object"}
+    finally:
+        await client.cleanup()
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(60)
+async def test_venice_client_cached_json_results_are_copies():
+    client = VeniceClient(VeniceConfig(api_key="real_key"))
+    client._session = FakeSession([
+        FakeResponse(200, {"choices": [{"text": '{"answer": "ok", "citations": []}'}]}),
+    ])
+    try:
+        first = await client.generate("Prompt", response_format="json")
+        first["choices"][0]["text"]["citations"].append("caller change")
+        
+        second = await client.generate("Prompt", response_format="json")
+        assert second["choices"][0]["text"] == {"answer": "ok", "citations": []}
+        second["choices"][0]["text"]["answer"] = "changed"
+        
+        [third] = await client.generate_batch(["Prompt"], response_format="json")
+        assert third["choices"][0]["text"] == {"answer": "ok", "citations": []}
+    finally:
+        await client.cleanup()